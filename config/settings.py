@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 
+from .sqlite import PRAGMAS, sqlite_options
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -48,6 +50,8 @@ LOGOUT_REDIRECT_URL = 'shop:home'
 LOGIN_URL = 'accounts:login'
 
 MIDDLEWARE = [
+    'shop.instrumentation.InstrumentationMiddleware',
+    'shop.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,6 +63,8 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'config.urls'
 
+# For template render time in the instrumentation, set BACKEND to
+# 'shop.instrumentation.TimedDjangoTemplates'.
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -81,13 +87,119 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite tuned in config/sqlite.py: WAL, synchronous=NORMAL, mmap, page cache
+# and busy_timeout on every connection, and BEGIN IMMEDIATE for atomic()
+# blocks (so even a read-only atomic() takes the write lock - keep them
+# short). Connections are reused for CONN_MAX_AGE seconds and checked before
+# reuse. `python manage.py loadtest_sqlite` compares these with the defaults.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': sqlite_options(),
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        # A file, not the shared-cache in-memory default, so threaded tests
+        # get the same locking (WAL, busy_timeout, BEGIN IMMEDIATE) as the site.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+    }
+}
+
+# Catalog read replica (shop.routers). Set SHOP_REPLICA_DATABASE = 'replica'
+# to send Category/Product reads of safe, unpinned requests to the database
+# below; `python manage.py sync_replica --interval 2` keeps the local SQLite
+# copy in step with the primary. Requests are pinned to the primary for
+# SHOP_REPLICA_PIN_SECONDS after a POST so redirects read their own writes.
+SHOP_REPLICA_DATABASE = None
+SHOP_REPLICA_PIN_SECONDS = 5
+DATABASE_ROUTERS = ['shop.routers.CatalogReplicaRouter']
+if SHOP_REPLICA_DATABASE:
+    DATABASES[SHOP_REPLICA_DATABASE] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.replica.sqlite3',
+        # query_only rejects any write that bypasses the router.
+        'OPTIONS': sqlite_options({**PRAGMAS, 'query_only': 'ON'}),
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        # Tests use the primary's test database for the replica.
+        'TEST': {'MIRROR': 'default'},
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory by default. LocMemCache is per process, so with several
+# workers switch to a shared backend, e.g.
+#   file: 'django.core.cache.backends.filebased.FileBasedCache', LOCATION: BASE_DIR / 'cache'
+#   db:   'django.core.cache.backends.db.DatabaseCache', LOCATION: 'shop_cache'
+#         (then run `python manage.py createcachetable`)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'roboshop',
     }
 }
 
+# Sessions (and the cart in them) are written to files and read through the
+# cache, so cart updates never queue on SQLite's write lock. Alternatives:
+# 'django.contrib.sessions.backends.cached_db' (cache + database) or
+# 'django.contrib.sessions.backends.cache' (cache only, lost on restart).
+# With several worker processes, point SESSION_CACHE_ALIAS at a shared
+# cache and SESSION_FILE_PATH at a shared, persistent directory.
+# `python manage.py benchmark_sessions` compares the engines.
+SESSION_ENGINE = 'shop.sessions'
+SESSION_CACHE_ALIAS = 'default'
+SESSION_FILE_PATH = None  # None: the system temp directory
+
+# Cache alias and timeout (seconds) for the rendered storefront grid.
+SHOP_CATALOG_CACHE = 'default'
+SHOP_CATALOG_CACHE_TIMEOUT = 60 * 15
+
+# Product search backend (dotted path). None picks SQLite FTS5 on SQLite and
+# 'shop.search.BasicSearchBackend' (icontains) on other databases.
+SHOP_SEARCH_BACKEND = None
+
+# Seconds a cart holds stock after an add/update. Expired holds are ignored
+# on read and deleted by `python manage.py release_expired_reservations`.
+SHOP_RESERVATION_TTL = 15 * 60
+
+# Cursor pagination for "view all", category and search listings.
+SHOP_PAGE_SIZE = 24
+SHOP_MAX_PAGE_SIZE = 100
+
+# Worker threads generating product image variants after upload. 0 runs
+# the work inline, after the saving transaction commits.
+SHOP_IMAGE_WORKERS = 2
+
+# Serve the catalog and cart pages (home, product detail, cart and its
+# add/update/remove actions) with the async views in shop/async_views.py.
+# Turn on when running under an ASGI server (config/asgi.py); under WSGI
+# each async view pays for an event loop. `python manage.py benchmark_asgi`
+# compares WSGI + sync views with ASGI + async views.
+SHOP_ASYNC_VIEWS = False
+
+# Per-request SQL/template/view timing (Server-Timing header and a JSON log
+# line on the 'shop.instrumentation' logger). Off by default: the middleware
+# then unloads itself at startup.
+SHOP_INSTRUMENTATION = False
+SHOP_INSTRUMENTATION_SLOW_QUERIES = 3
+# The log line is a warning when a statement is repeated exactly, or when one
+# statement shape (same SQL, other values) runs more than this many times -
+# an N+1 loop. Fewer same-shape repeats are logged at INFO.
+SHOP_INSTRUMENTATION_REPEAT_THRESHOLD = 10
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'shop.instrumentation': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -125,10 +237,28 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+# `python manage.py collectstatic` minifies, hashes and precompresses into here.
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Serve STATIC_ROOT from Django (shop.serving), picking .br/.gz siblings by
+# Accept-Encoding. With DEBUG, runserver serves the unprocessed sources first.
+SHOP_SERVE_STATIC = True
 
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Product images are content-addressed: stored once per distinct upload
+# under products/<hh>/<sha256>.<ext> and deleted when no product uses them.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'shop.staticfiles.CompressedManifestStaticFilesStorage'},
+    'product_images': {'BACKEND': 'shop.storage.ContentAddressedStorage'},
+}
+
+# Serve MEDIA_URL from Django (shop.serving) - development, or when no web
+# server in front does it. Content-addressed files get immutable caching.
+SHOP_SERVE_MEDIA = DEBUG
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,40 @@
+"""SQLite connection setup for a multi-threaded web workload.
+
+Django's sqlite3 backend runs OPTIONS["init_command"] on every new
+connection and starts atomic() blocks with OPTIONS["transaction_mode"].
+sqlite_options() builds both from PRAGMAS:
+
+- WAL journal: readers keep reading while checkout writes, instead of
+  waiting for the rollback journal's exclusive lock.
+- synchronous=NORMAL: with WAL, fsync only at checkpoints; a power loss
+  can drop the last transactions but never corrupts the file.
+- mmap and a larger page cache: catalog reads come from memory.
+- busy_timeout: a writer waits for the write lock rather than failing
+  with "database is locked".
+- BEGIN IMMEDIATE: a write transaction takes the write lock up front, so
+  two transactions that both read first can no longer deadlock on the
+  upgrade (which SQLite reports as "database is locked" at once, without
+  honouring busy_timeout).
+"""
+
+PRAGMAS = {
+    # Persistent: stored in the database file, creates <name>-wal / -shm.
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 128 * 1024 * 1024,
+    # Negative values are KiB: about 32 MB of page cache per connection.
+    "cache_size": -32000,
+    "busy_timeout": 5000,
+    "temp_store": "MEMORY",
+}
+
+
+def init_command(pragmas=None):
+    """PRAGMA statements for OPTIONS["init_command"]."""
+    pragmas = PRAGMAS if pragmas is None else pragmas
+    return ";".join(f"PRAGMA {name}={value}" for name, value in pragmas.items())
+
+
+def sqlite_options(pragmas=None, transaction_mode="IMMEDIATE"):
+    """DATABASES[...]["OPTIONS"] for the sqlite3 backend."""
+    return {"init_command": init_command(pragmas), "transaction_mode": transaction_mode}
@@ -1,6 +1,8 @@
 """Admin config for shop."""
 from django.contrib import admin
-from .models import Category, Product, Order, OrderItem, Payment
+from .models import (
+    Category, Product, StockReservation, Cart, CartItem, Order, OrderItem, Payment, SellerDailyStats,
+)
 
 
 @admin.register(Category)
@@ -16,6 +18,25 @@ class ProductAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ("name",)}
 
 
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ("product", "holder", "quantity", "expires_at")
+    list_select_related = ("product",)
+
+
+class CartItemInline(admin.TabularInline):
+    model = CartItem
+    extra = 0
+    raw_id_fields = ("product",)
+
+
+@admin.register(Cart)
+class CartAdmin(admin.ModelAdmin):
+    list_display = ("user", "created_at", "updated_at")
+    list_select_related = ("user",)
+    inlines = [CartItemInline]
+
+
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
@@ -31,3 +52,10 @@ class OrderAdmin(admin.ModelAdmin):
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "order", "amount", "payment_method", "created_at")
+
+
+@admin.register(SellerDailyStats)
+class SellerDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ("day", "seller", "product", "orders", "units", "revenue")
+    list_filter = ("day",)
+    list_select_related = ("seller", "product")
@@ -0,0 +1,172 @@
+"""Read-only JSON catalog API - categories, product listings, product detail.
+
+Rows are serialized from values() projections, never model instances, and
+``?fields=a,b`` narrows each object to some of its public fields.
+Responses carry strong ETags and are revalidated on every use
+(Cache-Control: no-cache): listings are tagged with the catalog version,
+product detail with the product's updated_at and the catalog version,
+which category and seller renames bump (Last-Modified is the later of
+the two changes). A matching If-None-Match / If-Modified-Since gets a 304
+before anything is serialized.
+"""
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.http import JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_safe
+
+from .cache import CatalogCache
+from .models import Category, Product
+from .pagination import InvalidCursor
+from .services import ProductService
+from .storage import product_image_storage
+
+# Bump when the JSON shape changes, so clients do not keep old representations.
+API_VERSION = 1
+
+# Public field name -> ORM lookup.
+CATEGORY_FIELDS = {"id": "id", "slug": "slug", "name": "name", "description": "description"}
+PRODUCT_FIELDS = {
+    "id": "id",
+    "slug": "slug",
+    "name": "name",
+    "description": "description",
+    "price": "price",
+    "stock": "stock",
+    "category": "category__slug",
+    "seller": "seller__username",
+    "image": "image",
+    "updated_at": "updated_at",
+}
+# Listings leave out the description unless asked for.
+PRODUCT_LIST_FIELDS = [name for name in PRODUCT_FIELDS if name != "description"]
+
+
+class InvalidFields(ValueError):
+    """Raised for a ?fields= parameter naming unknown fields."""
+
+
+def parse_fields(request, available, default=None):
+    """Public field names requested with ?fields=, in the order given."""
+    raw = request.GET.get("fields", "")
+    if not raw:
+        return list(default or available)
+    fields = list(dict.fromkeys(name.strip() for name in raw.split(",") if name.strip()))
+    unknown = [name for name in fields if name not in available]
+    if unknown or not fields:
+        raise InvalidFields(f"Unknown fields: {', '.join(unknown)}" if unknown else "No fields selected")
+    return fields
+
+
+def serialize(row, fields, lookups):
+    """JSON object of the requested fields from a values() row."""
+    data = {name: row[lookups[name]] for name in fields}
+    if data.get("image") is not None:
+        data["image"] = product_image_storage().url(data["image"]) if data["image"] else None
+    return data
+
+
+def make_etag(*parts):
+    return hashlib.sha256("|".join(str(part) for part in (API_VERSION, *parts)).encode("utf-8")).hexdigest()
+
+
+def query_key(request):
+    """Query string with parameters sorted, so equivalent URLs share an ETag."""
+    return "&".join(f"{key}={value}" for key, values in sorted(request.GET.lists()) for value in values)
+
+
+def catalog_etag(request, *args, **kwargs):
+    """Listings change exactly when the catalog version is bumped."""
+    return make_etag(request.path, query_key(request), CatalogCache.get_version())
+
+
+def product_updated_at(request, slug):
+    """updated_at of the requested product (None if missing), queried once per request."""
+    if not hasattr(request, "_api_updated_at"):
+        request._api_updated_at = Product.objects.filter(slug=slug).values_list("updated_at", flat=True).first()
+    return request._api_updated_at
+
+
+def product_etag(request, slug):
+    # The body also carries the category slug and seller name, which only
+    # the catalog version follows.
+    updated_at = product_updated_at(request, slug)
+    if updated_at is None:
+        return None
+    return make_etag(slug, query_key(request), updated_at.isoformat(), CatalogCache.get_version())
+
+
+def product_last_modified(request, slug):
+    """Later of the product's updated_at and the last catalog change (None if missing)."""
+    updated_at = product_updated_at(request, slug)
+    if updated_at is None:
+        return None
+    return max(updated_at, datetime.fromtimestamp(CatalogCache.get_changed_at(), tz=timezone.utc))
+
+
+def revalidate(view):
+    """Mark responses (including 304s) as cacheable but to be revalidated every time."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            patch_cache_control(response, public=True, no_cache=True)
+        return response
+    return wrapper
+
+
+def error(message, status=400):
+    return JsonResponse({"error": message}, status=status)
+
+
+@require_safe
+@revalidate
+@condition(etag_func=catalog_etag)
+def categories_view(request):
+    """All categories, by name."""
+    try:
+        fields = parse_fields(request, CATEGORY_FIELDS)
+    except InvalidFields as exc:
+        return error(str(exc))
+    lookups = [CATEGORY_FIELDS[name] for name in fields]
+    rows = Category.objects.order_by("name").values(*lookups)
+    return JsonResponse({"categories": [serialize(row, fields, CATEGORY_FIELDS) for row in rows]})
+
+
+@require_safe
+@revalidate
+@condition(etag_func=catalog_etag)
+def product_list_view(request):
+    """In-stock products by category, filtered by ?q= and ?category=, one cursor page at a time."""
+    try:
+        fields = parse_fields(request, PRODUCT_FIELDS, PRODUCT_LIST_FIELDS)
+        page = ProductService.get_product_values_page(
+            [PRODUCT_FIELDS[name] for name in fields],
+            request.GET.get("q", ""),
+            request.GET.get("category", ""),
+            request.GET.get("cursor", ""),
+            request.GET.get("page_size"),
+        )
+        products = [serialize(row, fields, PRODUCT_FIELDS) for row in page]
+    except InvalidFields as exc:
+        return error(str(exc))
+    except InvalidCursor:
+        return error("Invalid cursor")
+    return JsonResponse({"products": products, "next_cursor": page.next_cursor})
+
+
+@require_safe
+@revalidate
+@condition(etag_func=product_etag, last_modified_func=product_last_modified)
+def product_detail_view(request, slug):
+    """One product by slug."""
+    try:
+        fields = parse_fields(request, PRODUCT_FIELDS)
+    except InvalidFields as exc:
+        return error(str(exc))
+    row = Product.objects.filter(slug=slug).values(*[PRODUCT_FIELDS[name] for name in fields]).first()
+    if row is None:
+        return error("Product not found", status=404)
+    return JsonResponse(serialize(row, fields, PRODUCT_FIELDS))
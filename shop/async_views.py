@@ -0,0 +1,98 @@
+"""Async versions of the catalog and cart views, for serving under ASGI.
+
+Same routes, templates and behaviour as their counterparts in shop.views;
+shop/urls.py uses them when ``SHOP_ASYNC_VIEWS`` is on. Database work
+goes through the async ORM and the session through its async API, so a
+request waiting on I/O does not hold a worker thread. Templates must not
+query from the event loop, so the user and the cart summary they read
+are resolved before rendering.
+"""
+from django.contrib import messages
+from django.http import HttpResponseBadRequest
+from django.shortcuts import aget_object_or_404, redirect, render
+from django.views.decorators.http import require_http_methods
+
+from .cache import CatalogCache
+from .models import Product
+from .pagination import InvalidCursor
+from .services import CartService
+from .views import build_home_grid, home_params, not_modified, product_page_validators, revalidate_per_visitor
+
+
+async def prepare_request(request, hydrate_cart=False):
+    """Load what templates would otherwise fetch lazily (and synchronously)."""
+    request.user = await request.auser()
+    await CartService.get_summary(request).aprefetch(hydrate=hydrate_cart)
+
+
+async def home_view(request):
+    """Home page - products grouped by category, grid served from the catalog cache."""
+    params = home_params(request)
+    try:
+        product_grid = await CatalogCache.arender_grid(request, lambda: build_home_grid(**params), **params)
+    except InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor")
+    await prepare_request(request)
+    context = {
+        "product_grid": product_grid,
+        "categories": await CatalogCache.aget_categories(),
+        "q": params["q"],
+        "cat": params["cat"],
+    }
+    return render(request, "shop/home.html", context)
+
+
+async def product_detail_view(request, slug):
+    """Product detail page; conditional GETs are answered from updated_at before the product is loaded."""
+    # The validators only need the visitor and the cart's line count (the
+    # session, or one values_list): nothing is hydrated before a 304.
+    request.user = await request.auser()
+    await CartService.get_summary(request).aprefetch()
+    updated_at = await Product.objects.filter(slug=slug).values_list("updated_at", flat=True).afirst()
+    etag, last_modified = product_page_validators(request, updated_at, await CatalogCache.aget_version())
+    response = not_modified(request, etag, last_modified)
+    if response is None:
+        await prepare_request(request)
+        product = await aget_object_or_404(Product.objects.select_related("category", "seller"), slug=slug)
+        response = render(request, "shop/product_detail.html", {"product": product})
+    return revalidate_per_visitor(response, etag, last_modified)
+
+
+@require_http_methods(["POST"])
+async def cart_add_view(request, product_id):
+    """Add item to cart."""
+    quantity = int(request.POST.get("quantity", 1))
+    request.user = await request.auser()
+    success, err = await CartService.aadd_item(request, product_id, quantity)
+    if success:
+        messages.success(request, "Added to cart.")
+    else:
+        messages.error(request, err or "Could not add to cart.")
+    return redirect(request.META.get("HTTP_REFERER", "shop:home"))
+
+
+@require_http_methods(["POST"])
+async def cart_remove_view(request, product_id):
+    """Remove item from cart."""
+    request.user = await request.auser()
+    await CartService.aremove_item(request, product_id)
+    messages.success(request, "Removed from cart.")
+    return redirect("shop:cart")
+
+
+@require_http_methods(["POST"])
+async def cart_update_view(request, product_id):
+    """Update cart item quantity."""
+    quantity = int(request.POST.get("quantity", 1))
+    request.user = await request.auser()
+    success, err = await CartService.aupdate_quantity(request, product_id, quantity)
+    if not success:
+        messages.error(request, err or "Invalid quantity.")
+    return redirect("shop:cart")
+
+
+async def cart_view(request):
+    """View cart with totals."""
+    await prepare_request(request, hydrate_cart=True)
+    cart = CartService.get_summary(request)
+    return render(request, "shop/cart.html", {"cart_items": cart.items, "total": cart.total})
@@ -0,0 +1,159 @@
+"""Catalog cache - versioned keys for the rendered storefront grid."""
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .routers import read_from_primary
+
+# Rendered in place of the per-user CSRF token so one fragment serves everyone.
+CSRF_PLACEHOLDER = "__catalog_csrf_token__"
+
+
+class CatalogCache:
+    """Cache for catalog fragments, invalidated by bumping a version key.
+
+    Every entry key embeds the current catalog version, so a single
+    ``bump_version`` call (sent on Product/Category changes) orphans all
+    cached fragments at once; they then age out of the backend on their own.
+    """
+
+    VERSION_KEY = "catalog:version"
+    CHANGED_KEY = "catalog:changed_at"
+    GRID_TEMPLATE = "shop/_product_grid.html"
+
+    @staticmethod
+    def get_cache():
+        """Cache backend configured by SHOP_CATALOG_CACHE."""
+        return caches[getattr(settings, "SHOP_CATALOG_CACHE", "default")]
+
+    @staticmethod
+    def get_timeout():
+        return getattr(settings, "SHOP_CATALOG_CACHE_TIMEOUT", 60 * 15)
+
+    @classmethod
+    def get_version(cls):
+        """Current catalog version, seeded from the clock if missing.
+
+        A clock seed keeps versions increasing even if the backend evicted
+        the key, so stale fragments can never become current again.
+        """
+        cache = cls.get_cache()
+        version = cache.get(cls.VERSION_KEY)
+        if version is None:
+            cache.add(cls.VERSION_KEY, time.time_ns(), None)
+            version = cache.get(cls.VERSION_KEY)
+        return version
+
+    @classmethod
+    async def aget_version(cls):
+        cache = cls.get_cache()
+        version = await cache.aget(cls.VERSION_KEY)
+        if version is None:
+            await cache.aadd(cls.VERSION_KEY, time.time_ns(), None)
+            version = await cache.aget(cls.VERSION_KEY)
+        return version
+
+    @classmethod
+    def get_changed_at(cls):
+        """Unix time of the last version bump, for Last-Modified; seeded with now if missing."""
+        cache = cls.get_cache()
+        changed_at = cache.get(cls.CHANGED_KEY)
+        if changed_at is None:
+            cache.add(cls.CHANGED_KEY, time.time(), None)
+            changed_at = cache.get(cls.CHANGED_KEY)
+        return changed_at
+
+    @classmethod
+    def bump_version(cls):
+        """Invalidate every catalog fragment."""
+        cache = cls.get_cache()
+        try:
+            cache.incr(cls.VERSION_KEY)
+        except ValueError:
+            cache.set(cls.VERSION_KEY, time.time_ns(), None)
+        cache.set(cls.CHANGED_KEY, time.time(), None)
+
+    @staticmethod
+    def _digest(params):
+        raw = "|".join(f"{k}={params[k]}" for k in sorted(params))
+        return hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def make_key(cls, name, **params):
+        """Versioned key for a fragment and its parameters."""
+        return f"catalog:{name}:{cls.get_version()}:{cls._digest(params)}"
+
+    @classmethod
+    async def amake_key(cls, name, **params):
+        return f"catalog:{name}:{await cls.aget_version()}:{cls._digest(params)}"
+
+    @classmethod
+    def get_or_set(cls, key, builder):
+        """Return the cached value for key, building and storing it on a miss.
+
+        Built from the primary: a lagging replica must not be cached under
+        a version that already covers newer writes.
+        """
+        cache = cls.get_cache()
+        value = cache.get(key)
+        if value is None:
+            with read_from_primary():
+                value = builder()
+            cache.set(key, value, cls.get_timeout())
+        return value
+
+    @classmethod
+    async def aget_or_set(cls, key, builder):
+        """Async get_or_set; builder is a coroutine function."""
+        cache = cls.get_cache()
+        value = await cache.aget(key)
+        if value is None:
+            with read_from_primary():
+                value = await builder()
+            await cache.aset(key, value, cls.get_timeout())
+        return value
+
+    @classmethod
+    def get_categories(cls):
+        """All categories ordered by name."""
+        from .models import Category
+        return cls.get_or_set(
+            cls.make_key("categories"),
+            lambda: list(Category.objects.order_by("name")),
+        )
+
+    @classmethod
+    async def aget_categories(cls):
+        from .models import Category
+
+        async def build():
+            return [category async for category in Category.objects.order_by("name")]
+        return await cls.aget_or_set(await cls.amake_key("categories"), build)
+
+    @classmethod
+    def render_grid(cls, request, builder, **params):
+        """Rendered product grid for params; builder returns its template context.
+
+        The fragment is cached without a CSRF token and the requester's token
+        is substituted on the way out.
+        """
+        html = cls.get_or_set(
+            cls.make_key("grid", **params),
+            lambda: render_to_string(cls.GRID_TEMPLATE, {**builder(), "csrf_token": CSRF_PLACEHOLDER}),
+        )
+        return mark_safe(html.replace(CSRF_PLACEHOLDER, get_token(request)))
+
+    @classmethod
+    async def arender_grid(cls, request, builder, **params):
+        """Async render_grid; a cache miss runs the (sync) builder in a worker thread."""
+        html = await cls.aget_or_set(
+            await cls.amake_key("grid", **params),
+            sync_to_async(lambda: render_to_string(cls.GRID_TEMPLATE, {**builder(), "csrf_token": CSRF_PLACEHOLDER})),
+        )
+        return mark_safe(html.replace(CSRF_PLACEHOLDER, get_token(request)))
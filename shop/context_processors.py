@@ -1,9 +1,15 @@
 """Context processors - cart count in all templates."""
+from django.utils.functional import SimpleLazyObject
+
 from .services import CartService
 
 
 def cart_context(request):
-    """Add cart_count to every template."""
-    cart_items, _ = CartService.get_cart_items(request)
-    cart_count = sum(i["quantity"] for i in cart_items)
-    return {"cart_count": cart_count}
+    """Add the request's lazy cart summary and cart_count to every template.
+
+    Nothing is read until a template uses it; the count comes from the
+    session (or one query on a signed-in user's cart) and never hydrates
+    products.
+    """
+    cart = CartService.get_summary(request)
+    return {"cart": cart, "cart_count": SimpleLazyObject(lambda: cart.count)}
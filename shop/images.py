@@ -0,0 +1,170 @@
+"""Product image variants - resized WebP/JPEG copies generated off the request thread."""
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .storage import link_files, release_files
+
+logger = logging.getLogger(__name__)
+
+# Variant label -> bounding box (pixels). Images are only ever scaled down.
+VARIANT_SIZES = {
+    "thumb": (160, 160),
+    "card": (480, 480),
+    "detail": (1200, 1200),
+}
+
+# Output format -> (file extension, Pillow save options).
+VARIANT_FORMATS = {
+    "webp": ("webp", {"quality": 80, "method": 4}),
+    "jpeg": ("jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+_executor = None
+_executor_lock = Lock()
+
+
+def get_executor():
+    """Process-wide worker pool, created on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "SHOP_IMAGE_WORKERS", 2), thread_name_prefix="shop-images"
+            )
+        return _executor
+
+
+def variant_name(image_name, label, ext):
+    """Storage name requested for one variant, under <upload dir>/variants/.
+
+    Content-addressed storage replaces the file name with the variant's hash.
+    """
+    top = image_name.split("/", 1)[0] if "/" in image_name else ""
+    stem = posixpath.splitext(posixpath.basename(image_name))[0]
+    return posixpath.join(top, "variants", f"{stem}-{label}.{ext}")
+
+
+def _flatten(image):
+    """RGB copy of image; transparency is composited onto white (JPEG has no alpha)."""
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def render_variants(field_file):
+    """Write every size/format variant of an image file; returns the variants dict.
+
+    {"card": {"width": 480, "height": 376, "webp": "products/variants/x-card.webp",
+    "jpeg": "products/variants/x-card.jpg"}, ...}
+    """
+    storage = field_file.storage
+    with storage.open(field_file.name, "rb") as fh:
+        original = Image.open(fh)
+        original.load()
+    original = ImageOps.exif_transpose(original)
+    webp_source = original if original.mode in ("RGB", "RGBA") else original.convert("RGBA")
+    jpeg_source = _flatten(original)
+    variants = {}
+    for label, box in VARIANT_SIZES.items():
+        entry = {}
+        for fmt, (ext, options) in VARIANT_FORMATS.items():
+            image = (webp_source if fmt == "webp" else jpeg_source).copy()
+            image.thumbnail(box, Image.Resampling.LANCZOS)
+            buffer = BytesIO()
+            image.save(buffer, format=fmt.upper(), **options)
+            # Storage names the file by its content hash: identical bytes reuse
+            # the existing name, and files are only deleted once no ProductFile
+            # row references them any more.
+            entry[fmt] = storage.save(variant_name(field_file.name, label, ext), ContentFile(buffer.getvalue()))
+            entry["width"], entry["height"] = image.size
+        variants[label] = entry
+    return variants
+
+
+def variant_files(variants):
+    """Every storage name referenced by a variants dict."""
+    return {
+        name
+        for entry in (variants or {}).values()
+        for fmt, name in entry.items()
+        if fmt in VARIANT_FORMATS
+    }
+
+
+def generate_variants(product_id):
+    """Build and store the variants of a product's current image.
+
+    The result is saved only if the product still has the image that was
+    processed, so a newer upload is never overwritten by an older job.
+    Returns the variants dict, or None when there was nothing to do.
+    """
+    from .cache import CatalogCache
+    from .models import Product
+    product = Product.objects.filter(id=product_id).only("image", "image_variants").first()
+    if product is None or not product.image:
+        return None
+    variants = render_variants(product.image)
+    with transaction.atomic():
+        # Under the write lock no release can run. A shared variant blob
+        # that a release deleted after render_variants reused it is missing
+        # now, so render again.
+        if not all(product.image.storage.exists(name) for name in variant_files(variants)):
+            variants = render_variants(product.image)
+        updated = Product.objects.filter(id=product_id, image=product.image.name).update(
+            image_variants=variants, updated_at=timezone.now()
+        )
+        if updated:
+            link_files(product_id, product_files(product.image.name, variants))
+    stale = variant_files(product.image_variants) - variant_files(variants)
+    if not updated:
+        stale = variant_files(variants)
+    release_files(stale, product.image.storage)
+    if updated:
+        CatalogCache.bump_version()
+        return variants
+    return None
+
+
+def product_files(image, variants):
+    """Every storage name a product points at (image and its variants)."""
+    return ({image} if image else set()) | variant_files(variants)
+
+
+def _run(product_id):
+    try:
+        generate_variants(product_id)
+    except Exception:
+        logger.exception("Image variants failed for product %s", product_id)
+    finally:
+        # Worker threads hold their own connections; don't leak them.
+        connection.close()
+
+
+def schedule_variants(product):
+    """Generate product's variants on the worker pool once the transaction commits.
+
+    With SHOP_IMAGE_WORKERS = 0 the work runs inline instead (management
+    commands, tests).
+    """
+    product_id = product.id
+
+    def submit():
+        if getattr(settings, "SHOP_IMAGE_WORKERS", 2) == 0:
+            generate_variants(product_id)
+        else:
+            get_executor().submit(_run, product_id)
+
+    transaction.on_commit(submit)
+
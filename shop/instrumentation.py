@@ -0,0 +1,157 @@
+"""Opt-in per-request instrumentation: SQL count/time, duplicates, template and view time.
+
+Enable with ``SHOP_INSTRUMENTATION = True``. When it is off the middleware
+removes itself at startup (MiddlewareNotUsed), so requests pay nothing.
+"""
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger("shop.instrumentation")
+
+# Recorder of the request being handled, read by the template backend.
+_current = ContextVar("shop_instrumentation", default=None)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def normalize_sql(sql):
+    """SQL with literals replaced, so the same statement with other values compares equal."""
+    return _LITERALS.sub("?", " ".join(sql.split()))
+
+
+class QueryRecorder:
+    """connection.execute_wrapper hook collecting statements and their timings."""
+
+    def __init__(self):
+        self.queries = []
+        self.template_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.queries.append((context["connection"].alias, sql, repr(params), elapsed))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def sql_ms(self):
+        return sum(q[3] for q in self.queries)
+
+    def slowest(self, limit):
+        return sorted(self.queries, key=lambda q: q[3], reverse=True)[:limit]
+
+    def duplicates(self):
+        """Statements run more than once: exact repeats and same-shape (N+1) repeats."""
+        exact = Counter((alias, sql, params) for alias, sql, params, _ in self.queries)
+        similar = Counter((alias, normalize_sql(sql)) for alias, sql, _, _ in self.queries)
+        return {
+            "exact": {sql: n for (_, sql, _), n in exact.items() if n > 1},
+            "similar": {sql: n for (_, sql), n in similar.items() if n > 1},
+        }
+
+
+class TimedTemplate:
+    """Template wrapper adding render time to the active recorder."""
+
+    def __init__(self, wrapped):
+        self._wrapped = wrapped
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+    def render(self, context=None, request=None):
+        recorder = _current.get()
+        if recorder is None:
+            return self._wrapped.render(context, request)
+        start = time.perf_counter()
+        try:
+            return self._wrapped.render(context, request)
+        finally:
+            recorder.template_ms += (time.perf_counter() - start) * 1000
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates backend whose templates report render time.
+
+    Opt in by using it as the TEMPLATES BACKEND; included templates are
+    counted as part of the template that includes them.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class InstrumentationMiddleware:
+    """Record queries and timings per request; emit Server-Timing and a log line."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, "SHOP_INSTRUMENTATION", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_limit = getattr(settings, "SHOP_INSTRUMENTATION_SLOW_QUERIES", 3)
+        self.repeat_threshold = getattr(settings, "SHOP_INSTRUMENTATION_REPEAT_THRESHOLD", 10)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        token = _current.set(recorder)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total_ms = (time.perf_counter() - start) * 1000
+        view_ms = max(total_ms - recorder.sql_ms - recorder.template_ms, 0.0)
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={recorder.sql_ms:.2f};desc="{recorder.count} queries"',
+            f"tpl;dur={recorder.template_ms:.2f}",
+            f"view;dur={view_ms:.2f}",
+            f"total;dur={total_ms:.2f}",
+        ])
+        self.log(request, response, recorder, total_ms, view_ms)
+        return response
+
+    def log(self, request, response, recorder, total_ms, view_ms):
+        duplicates = recorder.duplicates()
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(total_ms, 2),
+            "view_ms": round(view_ms, 2),
+            "template_ms": round(recorder.template_ms, 2),
+            "sql_ms": round(recorder.sql_ms, 2),
+            "queries": recorder.count,
+            "slowest": [
+                {"db": alias, "ms": round(ms, 2), "sql": sql}
+                for alias, sql, _, ms in recorder.slowest(self.slow_limit)
+            ],
+            "duplicates": duplicates,
+        }
+        # Exact repeats are always wasted work; same-shape repeats only look
+        # like an N+1 loop once there are more of them than the threshold.
+        suspicious = duplicates["exact"] or any(
+            n > self.repeat_threshold for n in duplicates["similar"].values()
+        )
+        level = logging.WARNING if suspicious else logging.INFO
+        logger.log(level, json.dumps(record), extra={"instrumentation": record})
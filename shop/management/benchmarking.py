@@ -0,0 +1,38 @@
+"""Helpers shared by the benchmark, stress and load-test commands."""
+import sqlite3
+
+# Valid CheckoutForm data for scripted checkouts.
+CHECKOUT_DATA = {
+    "first_name": "Bench",
+    "last_name": "Mark",
+    "phone": "0555000000",
+    "wilaya": "algiers",
+    "address": "Benchmark",
+    "payment_method": "cod",
+}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of values; 0.0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+def copy_sqlite(source, target, journal_mode=None, timeout=5.0):
+    """Write a consistent snapshot of SQLite file source over target with the backup API.
+
+    journal_mode, if given, is set on the copy. timeout is how long to wait
+    for readers of target to let go. Returns the copy's page count.
+    """
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target, timeout=timeout)
+    try:
+        src.backup(dst)
+        if journal_mode:
+            dst.execute(f"PRAGMA journal_mode={journal_mode}")
+        return dst.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        src.close()
+        dst.close()
@@ -0,0 +1,159 @@
+"""Concurrent-connection throughput: WSGI with the sync views against ASGI with the async views.
+
+Each mode runs in its own process against its own copy of the database,
+because shop/urls.py picks the views when it is imported. Requests go
+through Django's WSGI-style handler from one thread per connection, or
+through the ASGI handler from one task per connection on a single event
+loop. No sockets are involved, so the numbers compare Django's request
+handling, not the web servers.
+"""
+import argparse
+import asyncio
+import json
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from shop.management.benchmarking import copy_sqlite, percentile
+
+# Mode -> SHOP_ASYNC_VIEWS
+MODES = {"wsgi": False, "asgi": True}
+
+
+def plan(products):
+    """One visit of a shopper: browse, look at a product, add it, view and empty the cart."""
+    product = random.choice(products)
+    return [
+        ("get", reverse("shop:home"), None),
+        ("get", reverse("shop:product_detail", args=[product["slug"]]), None),
+        ("post", reverse("shop:cart_add", args=[product["id"]]), {"quantity": 1}),
+        ("get", reverse("shop:cart"), None),
+        ("post", reverse("shop:cart_remove", args=[product["id"]]), {}),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Compare concurrent-connection throughput of WSGI + sync views and ASGI + async views"
+    # The URLconf must be imported only after SHOP_ASYNC_VIEWS is set for the run.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--connections", type=int, default=32, help="Concurrent client connections")
+        parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each run")
+        parser.add_argument("--modes", nargs="*", default=list(MODES), choices=list(MODES))
+        parser.add_argument("--seed", type=int, default=1)
+        # Internal: run one mode against a database copy and print JSON.
+        parser.add_argument("--run", choices=list(MODES), help=argparse.SUPPRESS)
+        parser.add_argument("--database-copy", help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options["run"]:
+            self.stdout.write(json.dumps(self.run(options)))
+            return
+        source = settings.DATABASES["default"]
+        if source["ENGINE"] != "django.db.backends.sqlite3":
+            raise CommandError("benchmark_asgi copies the SQLite database; it does not run on other backends.")
+        workdir = Path(tempfile.mkdtemp(prefix="benchmark-asgi-"))
+        try:
+            self.stdout.write(f"{options['connections']} connections, {options['seconds']:.0f}s per mode")
+            self.stdout.write(f"{'mode':<6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+            for mode in options["modes"]:
+                copy = workdir / f"{mode}.sqlite3"
+                copy_sqlite(source["NAME"], copy)
+                result = self.spawn(mode, copy, options)
+                self.stdout.write(
+                    f"{mode:<6} {result['throughput']:8.0f} {result['p50']:8.2f} {result['p95']:8.2f} "
+                    f"{result['errors']:7d}"
+                )
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def spawn(self, mode, copy, options):
+        command = [
+            sys.executable, "-m", "django", "benchmark_asgi", "--run", mode, "--database-copy", str(copy),
+            "--connections", str(options["connections"]), "--seconds", str(options["seconds"]),
+            "--seed", str(options["seed"]),
+        ]
+        process = subprocess.run(command, cwd=settings.BASE_DIR, capture_output=True, text=True)
+        if process.returncode:
+            raise CommandError(f"{mode} run failed:\n{process.stderr}")
+        return json.loads(process.stdout.strip().splitlines()[-1])
+
+    def run(self, options):
+        """Measure one mode; only called in the child process."""
+        settings.SHOP_ASYNC_VIEWS = MODES[options["run"]]
+        settings.DATABASES["default"]["NAME"] = options["database_copy"]
+        settings.SESSION_FILE_PATH = str(Path(options["database_copy"]).parent)
+        settings.ALLOWED_HOSTS = ["*"]
+        from shop.models import Product
+        random.seed(options["seed"])
+        products = list(Product.objects.filter(stock__gt=0).values("id", "slug")[:500])
+        connections.close_all()
+        if not products:
+            raise CommandError("The database has no products in stock; run generate_data first.")
+        deadline = time.perf_counter() + options["seconds"]
+        if options["run"] == "asgi":
+            timings, errors = asyncio.run(self.drive_asgi(products, options["connections"], deadline))
+        else:
+            timings, errors = self.drive_wsgi(products, options["connections"], deadline)
+        return {
+            "throughput": len(timings) / options["seconds"],
+            "p50": percentile(timings, 50),
+            "p95": percentile(timings, 95),
+            "errors": errors,
+        }
+
+    def drive_wsgi(self, products, count, deadline):
+        timings, errors = [], [0]
+        lock = threading.Lock()
+        barrier = threading.Barrier(count)
+
+        def connection():
+            client, local, failed = Client(raise_request_exception=False), [], 0
+            barrier.wait()
+            try:
+                while time.perf_counter() < deadline:
+                    for method, path, data in plan(products):
+                        start = time.perf_counter()
+                        response = getattr(client, method)(path, data)
+                        local.append((time.perf_counter() - start) * 1000)
+                        failed += response.status_code >= 500
+            finally:
+                connections.close_all()
+            with lock:
+                timings.extend(local)
+                errors[0] += failed
+
+        threads = [threading.Thread(target=connection) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return timings, errors[0]
+
+    async def drive_asgi(self, products, count, deadline):
+        timings, errors = [], 0
+
+        async def connection():
+            nonlocal errors
+            client = AsyncClient(raise_request_exception=False)
+            while time.perf_counter() < deadline:
+                for method, path, data in plan(products):
+                    start = time.perf_counter()
+                    response = await getattr(client, method)(path, data)
+                    timings.append((time.perf_counter() - start) * 1000)
+                    errors += response.status_code >= 500
+
+        await asyncio.gather(*(connection() for _ in range(count)))
+        return timings, errors
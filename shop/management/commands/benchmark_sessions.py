@@ -0,0 +1,97 @@
+"""Compare session engines under concurrent cart updates."""
+import json
+import random
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+from django.utils.module_loading import import_string
+
+from shop.management.benchmarking import percentile
+from shop.services import CartService
+
+ENGINES = [
+    "django.contrib.sessions.backends.db",
+    "django.contrib.sessions.backends.cached_db",
+    "django.contrib.sessions.backends.cache",
+    "django.contrib.sessions.backends.file",
+    "shop.sessions",
+]
+
+
+class Command(BaseCommand):
+    help = "Measure session write throughput of each engine with concurrent cart updates"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--engines", nargs="*", default=ENGINES, help="SESSION_ENGINE module paths")
+        parser.add_argument("--threads", type=int, default=8, help="Concurrent shoppers (one session each)")
+        parser.add_argument("--updates", type=int, default=200, help="Cart updates per shopper")
+        parser.add_argument("--lines", type=int, default=20, help="Distinct products in each cart")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.report_encoding(options["lines"])
+        self.stdout.write(f"{'engine':<45} {'writes/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+        for engine in options["engines"]:
+            store_class = import_string(f"{engine}.SessionStore")
+            result = self.run(store_class, options["threads"], options["updates"], options["lines"], options["seed"])
+            self.stdout.write(
+                f"{engine:<45} {result['throughput']:9.0f} {result['p50']:8.2f} {result['p95']:8.2f} "
+                f"{result['errors']:7d}"
+            )
+
+    def report_encoding(self, lines):
+        cart = {str(1000 + i): i % 5 + 1 for i in range(lines)}
+        legacy = len(json.dumps(cart, separators=(",", ":")))
+        compact = len(json.dumps(CartService.encode_cart(cart)))
+        self.stdout.write(f"Cart of {lines} lines: {legacy} bytes as a JSON dict, {compact} bytes compact.")
+
+    def run(self, store_class, threads, updates, lines, seed):
+        keys = []
+        for _ in range(threads):
+            store = store_class()
+            store.create()
+            keys.append(store.session_key)
+        timings, errors = [], []
+        lock = threading.Lock()
+        barrier = threading.Barrier(threads)
+
+        def shopper(index):
+            rng = random.Random(seed + index)
+            local, failed = [], 0
+            barrier.wait()
+            try:
+                for _ in range(updates):
+                    start = time.perf_counter()
+                    try:
+                        store = store_class(keys[index])
+                        cart = CartService.decode_cart(store.get(CartService.CART_KEY))
+                        cart[str(1000 + rng.randrange(lines))] = rng.randint(1, 5)
+                        store[CartService.CART_KEY] = CartService.encode_cart(cart)
+                        store.save()
+                    except DatabaseError:
+                        failed += 1
+                    local.append((time.perf_counter() - start) * 1000)
+            finally:
+                connection.close()
+            with lock:
+                timings.extend(local)
+                errors.append(failed)
+
+        workers = [threading.Thread(target=shopper, args=(i,)) for i in range(threads)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        for key in keys:
+            store_class(key).delete()
+        return {
+            "throughput": len(timings) / elapsed,
+            "p50": statistics.median(timings),
+            "p95": percentile(timings, 95),
+            "errors": sum(errors),
+        }
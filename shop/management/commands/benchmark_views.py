@@ -0,0 +1,217 @@
+"""Request-level benchmark of every shop and accounts URL, with baseline comparison."""
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts import urls as accounts_urls
+from shop import urls as shop_urls
+from shop.management.benchmarking import CHECKOUT_DATA, percentile
+from shop.models import Category, Product
+from shop.services import OrderService
+
+User = get_user_model()
+
+class Fixture:
+    """Users, product and order the scenarios run against (rolled back afterwards)."""
+
+    def __init__(self):
+        self.seller = User.objects.create_user("bench-seller", password="bench", role="seller")
+        self.buyer = User.objects.create_user("bench-buyer", password="bench-pass-123", role="buyer")
+        category = Category.objects.order_by("name").first() or Category.objects.create(name="Bench", slug="bench")
+        self.category = category
+        self.product = Product.objects.create(
+            category=category,
+            seller=self.seller,
+            name="Bench Board",
+            slug="bench-board",
+            description="Benchmark product.",
+            price=Decimal("9.99"),
+            stock=1_000_000,
+        )
+        self.order = OrderService.place_order(
+            self.buyer, CHECKOUT_DATA, [{"product": self.product, "quantity": 1}]
+        )
+
+
+def scenarios(fx):
+    """URL name -> (method, path, login user, POST data, prepare(client))."""
+    pid = fx.product.id
+
+    def with_cart(client):
+        client.post(reverse("shop:cart_add", args=[pid]), {"quantity": 2})
+
+    return {
+        "shop:home": ("get", reverse("shop:home"), None, None, None),
+        "shop:home?q": ("get", reverse("shop:home") + "?q=sensor", None, None, None),
+        "shop:home?category": ("get", reverse("shop:home") + f"?category={fx.category.slug}", None, None, None),
+        "shop:product_more": ("get", reverse("shop:product_more") + f"?category={fx.category.slug}", None, None, None),
+        "shop:product_detail": ("get", reverse("shop:product_detail", args=[fx.product.slug]), None, None, None),
+        "shop:product_create": ("get", reverse("shop:product_create"), fx.seller, None, None),
+        "shop:product_edit": ("get", reverse("shop:product_edit", args=[fx.product.slug]), fx.seller, None, None),
+        "shop:product_delete": ("post", reverse("shop:product_delete", args=[fx.product.slug]), fx.seller, {}, None),
+        "shop:cart": ("get", reverse("shop:cart"), None, None, with_cart),
+        "shop:cart_add": ("post", reverse("shop:cart_add", args=[pid]), None, {"quantity": 1}, None),
+        "shop:cart_remove": ("post", reverse("shop:cart_remove", args=[pid]), None, {}, with_cart),
+        "shop:cart_update": ("post", reverse("shop:cart_update", args=[pid]), None, {"quantity": 3}, with_cart),
+        "shop:checkout": ("get", reverse("shop:checkout"), fx.buyer, None, with_cart),
+        "shop:checkout[post]": ("post", reverse("shop:checkout"), fx.buyer, CHECKOUT_DATA, with_cart),
+        "shop:order_success": ("get", reverse("shop:order_success", args=[fx.order.id]), fx.buyer, None, None),
+        "shop:seller_dashboard": ("get", reverse("shop:seller_dashboard"), fx.seller, None, None),
+        "shop:seller_orders": ("get", reverse("shop:seller_orders"), fx.seller, None, None),
+        "shop:api_categories": ("get", reverse("shop:api_categories"), None, None, None),
+        "shop:api_products": ("get", reverse("shop:api_products") + f"?category={fx.category.slug}", None, None, None),
+        "shop:api_products?fields": (
+            "get", reverse("shop:api_products") + "?q=sensor&fields=id,name,price", None, None, None
+        ),
+        "shop:api_product": ("get", reverse("shop:api_product", args=[fx.product.slug]), None, None, None),
+        "accounts:register": ("get", reverse("accounts:register"), None, None, None),
+        "accounts:login": ("get", reverse("accounts:login"), None, None, None),
+        "accounts:login[post]": (
+            "post", reverse("accounts:login"), None, {"username": "bench-buyer", "password": "bench-pass-123"}, None
+        ),
+        "accounts:logout": ("post", reverse("accounts:logout"), fx.buyer, {}, None),
+        "accounts:seller_profile": ("get", reverse("accounts:seller_profile"), fx.seller, None, None),
+    }
+
+
+def url_names():
+    """Every named route in shop/urls.py and accounts/urls.py."""
+    names = set()
+    for module in (shop_urls, accounts_urls):
+        names.update(f"{module.app_name}:{p.name}" for p in module.urlpatterns if p.name)
+    return names
+
+
+class Command(BaseCommand):
+    help = "Benchmark every shop/accounts URL (p50/p95 latency, queries, memory) and compare with a baseline"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=30)
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument("--output", default="benchmarks/results.json")
+        parser.add_argument("--baseline", default="benchmarks/baseline.json")
+        parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+        parser.add_argument("--threshold", type=float, default=0.25,
+                            help="Allowed relative regression of p95 latency and memory (0.25 = 25%%)")
+        parser.add_argument("--only", nargs="*", help="Benchmark only these scenario names")
+
+    def handle(self, *args, **options):
+        # Fixtures and every request are rolled back: the database is left untouched.
+        with transaction.atomic():
+            fx = Fixture()
+            plan = scenarios(fx)
+            missing = url_names() - {name.split("?")[0].split("[")[0] for name in plan}
+            if missing:
+                raise CommandError(f"No benchmark scenario for: {', '.join(sorted(missing))}")
+            if options["only"]:
+                unknown = [name for name in options["only"] if name not in plan]
+                if unknown:
+                    raise CommandError(
+                        f"Unknown scenario: {', '.join(unknown)}. Valid names: {', '.join(sorted(plan))}"
+                    )
+                plan = {name: plan[name] for name in options["only"]}
+            results = {name: self.measure(spec, options["iterations"], options["warmup"])
+                       for name, spec in plan.items()}
+            transaction.set_rollback(True)
+
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<26} p50={r['p50_ms']:7.2f}ms  p95={r['p95_ms']:7.2f}ms  "
+                f"queries={r['queries']:3d}  peak_mem={r['peak_kib']:8.1f}KiB  status={r['status']}  "
+                f"failures={r['failures']}"
+            )
+        report = {
+            "meta": {"python": platform.python_version(), "database": settings.DATABASES["default"]["ENGINE"],
+                     "iterations": options["iterations"]},
+            "results": results,
+        }
+        self.write_json(options["output"], report)
+        failed = {name: r for name, r in results.items() if r["failures"]}
+        if failed:
+            # Error pages are not timings of the page; never compare or save them.
+            raise CommandError("Requests failed (4xx/5xx):\n  " + "\n  ".join(
+                f"{name}: {r['failures']} of {options['iterations']} timed requests, last status {r['status']}"
+                for name, r in failed.items()
+            ))
+        if options["save_baseline"]:
+            self.write_json(options["baseline"], report)
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {options['baseline']}"))
+            return
+        self.compare(results, options["baseline"], options["threshold"])
+
+    def measure(self, spec, iterations, warmup):
+        method, path, user, data, prepare = spec
+        timings, queries, status = [], [], None
+        peak = failures = 0
+        for i in range(warmup + iterations + 1):
+            with transaction.atomic():
+                client = Client(HTTP_HOST="localhost")
+                if user:
+                    client.force_login(user)
+                if prepare:
+                    prepare(client)
+                request = getattr(client, method)
+                trace = i == warmup + iterations
+                if trace:
+                    tracemalloc.start()
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    response = request(path, data) if data is not None else request(path)
+                    elapsed = (time.perf_counter() - start) * 1000
+                if trace:
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                elif i >= warmup:
+                    if response.status_code >= 400:
+                        failures += 1
+                    else:
+                        timings.append(elapsed)
+                        queries.append(len(ctx))
+                status = response.status_code
+                transaction.set_rollback(True)
+        return {
+            "p50_ms": round(statistics.median(timings), 3) if timings else 0.0,
+            "p95_ms": round(percentile(timings, 95), 3),
+            "queries": max(queries, default=0),
+            "peak_kib": round(peak / 1024, 1),
+            "status": status,
+            "failures": failures,
+        }
+
+    def write_json(self, path, data):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data, indent=2, sort_keys=True))
+
+    def compare(self, results, baseline_path, threshold):
+        path = Path(baseline_path)
+        if not path.exists():
+            self.stdout.write(self.style.WARNING(f"No baseline at {path}; run with --save-baseline to create one."))
+            return
+        baseline = json.loads(path.read_text())["results"]
+        regressions = []
+        for name, r in results.items():
+            base = baseline.get(name)
+            if not base:
+                continue
+            if r["queries"] > base["queries"]:
+                regressions.append(f"{name}: queries {base['queries']} -> {r['queries']}")
+            if r["p95_ms"] > base["p95_ms"] * (1 + threshold):
+                regressions.append(f"{name}: p95 {base['p95_ms']:.2f}ms -> {r['p95_ms']:.2f}ms")
+            if r["peak_kib"] > base["peak_kib"] * (1 + threshold):
+                regressions.append(f"{name}: peak memory {base['peak_kib']}KiB -> {r['peak_kib']}KiB")
+        if regressions:
+            raise CommandError("Performance regressions:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against baseline."))
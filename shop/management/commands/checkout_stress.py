@@ -0,0 +1,80 @@
+"""Fire parallel checkouts at one product and verify stock never oversells."""
+import threading
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+
+from shop.management.benchmarking import CHECKOUT_DATA
+from shop.models import Category, Order, Product
+from shop.services import OrderService, OutOfStock
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = "Run concurrent checkouts against a single SKU and check stock stays consistent"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stock", type=int, default=20, help="Initial stock of the test product")
+        parser.add_argument("--buyers", type=int, default=50, help="Number of parallel checkouts")
+        parser.add_argument("--quantity", type=int, default=1, help="Units bought per checkout")
+        parser.add_argument("--keep", action="store_true", help="Keep the test product, users and orders")
+
+    def handle(self, *args, **options):
+        stock, buyers, quantity = options["stock"], options["buyers"], options["quantity"]
+        tag = uuid.uuid4().hex[:8]
+        seller = User.objects.create_user(f"stress-seller-{tag}", role="seller")
+        buyer = User.objects.create_user(f"stress-buyer-{tag}", role="buyer")
+        category, _ = Category.objects.get_or_create(slug="stress-test", defaults={"name": "Stress test"})
+        product = Product.objects.create(
+            category=category,
+            seller=seller,
+            name=f"Stress SKU {tag}",
+            slug=f"stress-sku-{tag}",
+            description="Checkout stress test product",
+            price=Decimal("1.00"),
+            stock=stock,
+        )
+
+        results = {"sold": 0, "out_of_stock": 0, "db_errors": 0}
+        lock = threading.Lock()
+        start = threading.Barrier(buyers)
+
+        def checkout():
+            # Each thread works on its own copy so no Python state is shared.
+            line = {"product": Product.objects.get(id=product.id), "quantity": quantity}
+            start.wait()
+            try:
+                OrderService.place_order(buyer, CHECKOUT_DATA, [line])
+                outcome = "sold"
+            except OutOfStock:
+                outcome = "out_of_stock"
+            except DatabaseError:
+                outcome = "db_errors"
+            finally:
+                connection.close()
+            with lock:
+                results[outcome] += 1
+
+        threads = [threading.Thread(target=checkout) for _ in range(buyers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        product.refresh_from_db()
+        orders = Order.objects.filter(user=buyer).count()
+        self.stdout.write(
+            f"buyers={buyers} sold={results['sold']} out_of_stock={results['out_of_stock']} "
+            f"db_errors={results['db_errors']} orders={orders} final_stock={product.stock}"
+        )
+        expected_stock = stock - results["sold"] * quantity
+        if not options["keep"]:
+            product.delete()
+            seller.delete()
+            buyer.delete()
+        if product.stock < 0 or product.stock != expected_stock or orders != results["sold"]:
+            raise CommandError(f"Inconsistent stock: expected {expected_stock}, found {product.stock}")
+        self.stdout.write(self.style.SUCCESS("Stock consistent: no overselling."))
@@ -0,0 +1,65 @@
+"""Move product images into content-addressed storage and delete unreferenced blobs."""
+import posixpath
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from shop.images import product_files
+from shop.models import Product
+from shop.storage import is_hashed_name, product_image_storage
+
+
+class Command(BaseCommand):
+    help = "Rehash legacy product image names and garbage-collect unreferenced product media"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rehash", action="store_true",
+                            help="Re-store images saved before content addressing under their hash")
+        parser.add_argument("--dry-run", action="store_true", help="Report without changing anything")
+        parser.add_argument("--grace", type=int, default=60,
+                            help="Keep files newer than this many minutes (uploads not yet committed)")
+
+    def handle(self, *args, **options):
+        storage = product_image_storage()
+        if options["rehash"]:
+            self.rehash(storage, options["dry_run"])
+        cutoff = timezone.now() - timedelta(minutes=options["grace"])
+        unused = sorted(
+            name for name in set(self.walk(storage, "products")) - self.all_references()
+            if storage.get_modified_time(name) < cutoff
+        )
+        for name in unused:
+            if not options["dry_run"]:
+                storage.delete(name)
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(unused)} unreferenced files."))
+
+    def rehash(self, storage, dry_run):
+        legacy = Product.objects.exclude(image="").exclude(image__isnull=True)
+        moved = 0
+        for product in legacy.only("image", "image_variants").iterator():
+            if is_hashed_name(product.image.name) or not storage.exists(product.image.name):
+                continue
+            moved += 1
+            if dry_run:
+                continue
+            with storage.open(product.image.name, "rb") as fh:
+                name = storage.save(product.image.name, fh)
+            # save() fires the signals that release the legacy file.
+            product.image = name
+            product.save(update_fields=["image", "updated_at"])
+        self.stdout.write(f"Rehashed {moved} product images.")
+
+    def all_references(self):
+        names = set()
+        for image, variants in Product.objects.values_list("image", "image_variants").iterator():
+            names |= product_files(image, variants)
+        return names
+
+    def walk(self, storage, directory):
+        dirs, files = storage.listdir(directory) if storage.exists(directory) else ([], [])
+        for filename in files:
+            yield posixpath.join(directory, filename)
+        for sub in dirs:
+            yield from self.walk(storage, posixpath.join(directory, sub))
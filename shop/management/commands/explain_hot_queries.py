@@ -0,0 +1,130 @@
+"""Show query plans and timings for the hot query paths, with and without indexes."""
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from shop.models import Category, Order, OrderItem, Product
+from shop.services import ProductService
+
+User = get_user_model()
+
+# Indexes added for these queries; dropped (inside a rolled-back transaction)
+# to show the "before" plans.
+HOT_INDEXES = {
+    "product": ["product_instock_cat_name_idx", "product_seller_created_idx"],
+    "order": ["order_created_idx"],
+    "orderitem": ["orderitem_seller_order_idx"],
+}
+
+
+def hot_queries():
+    """Name -> queryset for each hot path, evaluated against current data."""
+    seller = User.objects.filter(role="seller").order_by("id").first()
+    category = Category.objects.order_by("name").first()
+    page_qs, order = ProductService.search_products(cat=category.slug if category else "")
+    return {
+        "home_grid": ProductService.top_products(),
+        "category_page": page_qs.order_by("category__name", *order, "id")[:25],
+        "seller_products": Product.objects.filter(seller=seller)[:50],
+        "seller_order_items": OrderItem.objects.filter(seller=seller)
+        .select_related("order", "product")
+        .order_by("-order__created_at")[:50],
+        "recent_orders": Order.objects.order_by("-created_at", "-id")[:50],
+    }
+
+
+class Command(BaseCommand):
+    help = "Print EXPLAIN plans and timings for hot queries with and without the hot-path indexes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per query")
+        parser.add_argument("--seed-products", type=int, default=0, help="Temporary extra products to insert first")
+        parser.add_argument("--seed-orders", type=int, default=0, help="Temporary extra orders (3 lines each) to insert first")
+
+    def handle(self, *args, **options):
+        # Everything, including seeding and dropped indexes, is rolled back.
+        with transaction.atomic():
+            if options["seed_products"] or options["seed_orders"]:
+                self.seed(options["seed_products"], options["seed_orders"])
+            self.stdout.write(self.style.MIGRATE_HEADING("With hot-path indexes"))
+            after = self.report(options["repeat"], "with")
+            with connection.cursor() as cursor:
+                for names in HOT_INDEXES.values():
+                    for name in names:
+                        cursor.execute(f"DROP INDEX {connection.ops.quote_name(name)}")
+            self.stdout.write(self.style.MIGRATE_HEADING("Without hot-path indexes"))
+            before = self.report(options["repeat"], "without")
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.MIGRATE_HEADING("Summary (median ms)"))
+        for name in after:
+            self.stdout.write(f"  {name:<20} before={before[name]:8.2f}  after={after[name]:8.2f}")
+
+    def report(self, repeat, phase):
+        timings = {}
+        for name, queryset in hot_queries().items():
+            runs = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(queryset._chain())
+                runs.append((time.perf_counter() - start) * 1000)
+            timings[name] = statistics.median(runs)
+            self.stdout.write(f"{name} ({timings[name]:.2f} ms)")
+            for line in self.explain(queryset, phase):
+                self.stdout.write(f"    {line}")
+        return timings
+
+    @staticmethod
+    def explain(queryset, phase):
+        """Plan rows for queryset (QuerySet.explain() cannot wrap window filters).
+
+        The phase comment keeps SQLite from reusing a plan prepared before
+        the indexes were dropped.
+        """
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql} /* {phase} indexes */", params)
+            return [" ".join(str(col) for col in row) for row in cursor.fetchall()]
+
+    def seed(self, products, orders):
+        seller = User.objects.filter(role="seller").order_by("id").first() or User.objects.create_user(
+            "explain-seller", role="seller"
+        )
+        buyer = User.objects.filter(role="buyer").order_by("id").first() or seller
+        categories = list(Category.objects.all()) or [Category.objects.create(name="Explain", slug="explain")]
+        Product.objects.bulk_create(
+            [
+                Product(
+                    category=categories[i % len(categories)],
+                    seller=seller,
+                    name=f"Explain product {i:07d}",
+                    slug=f"explain-product-{i}",
+                    description="Synthetic product for query plan comparison.",
+                    price=Decimal("9.99"),
+                    stock=i % 5,
+                )
+                for i in range(products)
+            ],
+            batch_size=500,
+        )
+        product_ids = list(Product.objects.values_list("id", flat=True)[:100])
+        created = Order.objects.bulk_create(
+            [
+                Order(user=buyer, first_name="E", last_name="X", phone="0", wilaya="algiers",
+                      address="-", payment_method="cod", total_price=Decimal("29.97"))
+                for _ in range(orders)
+            ],
+            batch_size=500,
+        )
+        OrderItem.objects.bulk_create(
+            [
+                OrderItem(order=order, product_id=product_ids[(order.id + k) % len(product_ids)],
+                          seller=seller, quantity=1, price=Decimal("9.99"))
+                for order in created
+                for k in range(3)
+            ],
+            batch_size=500,
+        )
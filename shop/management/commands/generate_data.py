@@ -0,0 +1,168 @@
+"""Generate a large, deterministic synthetic dataset for performance work."""
+import io
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from shop.constants import PAYMENT_METHODS, WILAYAS
+from shop.models import Category, Order, OrderItem, Payment, Product
+from shop.services import SellerAnalyticsService
+
+User = get_user_model()
+
+FIRST_NAMES = ["Amine", "Yacine", "Sara", "Lina", "Karim", "Nadia", "Walid", "Meriem", "Sofiane", "Imane"]
+LAST_NAMES = ["Benali", "Haddad", "Saidi", "Mansouri", "Cherif", "Bouzid", "Kaci", "Ait Ali", "Rahmani", "Belkacem"]
+VARIANTS = ["", "Pro", "Mini", "Plus", "Kit", "V2", "Pack of 5", "Pack of 10", "Clone", "Industrial"]
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk_create keep given created_at values instead of auto_now_add."""
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+class Command(BaseCommand):
+    help = "Generate sellers, buyers, products, orders, order items and payments in bulk (deterministic per --seed)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sellers", type=int, default=50)
+        parser.add_argument("--buyers", type=int, default=1000)
+        parser.add_argument("--products", type=int, default=100_000)
+        parser.add_argument("--orders", type=int, default=100_000)
+        parser.add_argument("--max-items", type=int, default=5, help="Maximum lines per order")
+        parser.add_argument("--days", type=int, default=365, help="Spread orders over this many past days")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows generated per transaction")
+        parser.add_argument("--prefix", default="gen", help="Prefix for generated usernames and slugs")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.prefix = options["prefix"]
+        # Base catalog: the 7 categories and 52 sample products used as name templates.
+        call_command("setup_data", stdout=self.stdout if options["verbosity"] > 1 else io.StringIO())
+        seller_ids = self.create_users("seller", options["sellers"])
+        buyer_ids = self.create_users("buyer", options["buyers"])
+        products = self.create_products(options["products"], seller_ids)
+        self.create_orders(options["orders"], options["max_items"], options["days"], buyer_ids, products)
+        # Orders were bulk-inserted, bypassing checkout's incremental stats.
+        self.log(f"Seller stats rows: {SellerAnalyticsService.rebuild()}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {User.objects.count()} users, {Product.objects.count()} products, "
+            f"{Order.objects.count()} orders, {OrderItem.objects.count()} order items."
+        ))
+
+    def log(self, message):
+        self.stdout.write(message)
+        self.stdout.flush()
+
+    def create_users(self, role, count):
+        password = make_password(f"{role}123")
+        prefix = f"{self.prefix}-{role}-"
+        for start in range(0, count, self.batch_size):
+            User.objects.bulk_create(
+                [
+                    User(username=f"{prefix}{i:06d}", email=f"{prefix}{i:06d}@roboshop.test",
+                         password=password, role=role)
+                    for i in range(start, min(start + self.batch_size, count))
+                ],
+                ignore_conflicts=True,
+            )
+        self.log(f"{role.title()}s: {count}")
+        return list(
+            User.objects.filter(username__startswith=prefix).order_by("id").values_list("id", flat=True)[:count]
+        )
+
+    def create_products(self, count, seller_ids):
+        """Create products; returns [(id, seller_id, price)] for order generation."""
+        templates = list(Product.objects.exclude(slug__startswith=f"{self.prefix}-").values_list(
+            "category_id", "name", "description", "price"
+        ).order_by("id"))
+        if not templates:
+            templates = [(Category.objects.order_by("id").values_list("id", flat=True).first(),
+                          "Component", "Electronic component.", Decimal("5.00"))]
+        for start in range(0, count, self.batch_size):
+            batch = []
+            for i in range(start, min(start + self.batch_size, count)):
+                category_id, name, description, price = self.rng.choice(templates)
+                variant = self.rng.choice(VARIANTS)
+                factor = Decimal(self.rng.randint(70, 160)) / 100
+                batch.append(Product(
+                    category_id=category_id,
+                    seller_id=self.rng.choice(seller_ids),
+                    name=f"{name} {variant} #{i}".replace("  ", " "),
+                    slug=f"{self.prefix}-product-{i}",
+                    description=description,
+                    price=(price * factor).quantize(Decimal("0.01")),
+                    stock=self.rng.choice([0, 0, 3, 10, 25, 50, 100, 250]),
+                ))
+            with transaction.atomic():
+                Product.objects.bulk_create(batch, batch_size=500, ignore_conflicts=True)
+            self.log(f"Products: {min(start + self.batch_size, count)}/{count}")
+        return list(
+            Product.objects.filter(slug__startswith=f"{self.prefix}-product-")
+            .order_by("id")
+            .values_list("id", "seller_id", "price")
+        )
+
+    def create_orders(self, count, max_items, days, buyer_ids, products):
+        now = timezone.now()
+        span = days * 24 * 3600
+        wilayas = [code for code, _ in WILAYAS]
+        methods = [code for code, _ in PAYMENT_METHODS]
+        created_at_fields = (Order._meta.get_field("created_at"), Payment._meta.get_field("created_at"))
+        with explicit_timestamps(*created_at_fields):
+            for start in range(0, count, self.batch_size):
+                size = min(self.batch_size, count - start)
+                orders, lines, contacts = [], [], []
+                for _ in range(size):
+                    picked = self.rng.sample(products, self.rng.randint(1, max_items))
+                    order_lines = [(pid, sid, price, self.rng.randint(1, 4)) for pid, sid, price in picked]
+                    contact = {
+                        "first_name": self.rng.choice(FIRST_NAMES),
+                        "last_name": self.rng.choice(LAST_NAMES),
+                        "phone": f"0{self.rng.choice('567')}{self.rng.randint(10_000_000, 99_999_999)}",
+                        "wilaya": self.rng.choice(wilayas),
+                        "address": f"{self.rng.randint(1, 200)} Rue {self.rng.choice(LAST_NAMES)}",
+                        "payment_method": self.rng.choice(methods),
+                    }
+                    created_at = now - timedelta(seconds=self.rng.randint(0, span))
+                    total = sum(price * qty for _, _, price, qty in order_lines)
+                    orders.append(Order(user_id=self.rng.choice(buyer_ids), total_price=total,
+                                        created_at=created_at, **contact))
+                    lines.append(order_lines)
+                    contacts.append(contact)
+                with transaction.atomic():
+                    Order.objects.bulk_create(orders, batch_size=500)
+                    OrderItem.objects.bulk_create(
+                        [
+                            OrderItem(order_id=order.id, product_id=pid, seller_id=sid, quantity=qty, price=price)
+                            for order, order_lines in zip(orders, lines)
+                            for pid, sid, price, qty in order_lines
+                        ],
+                        batch_size=500,
+                    )
+                    Payment.objects.bulk_create(
+                        [
+                            Payment(user_id=order.user_id, order_id=order.id, amount=order.total_price,
+                                    created_at=order.created_at, **contact)
+                            for order, contact in zip(orders, contacts)
+                        ],
+                        batch_size=500,
+                    )
+                self.log(f"Orders: {start + size}/{count}")
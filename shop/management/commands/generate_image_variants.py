@@ -0,0 +1,26 @@
+"""Generate resized image variants for existing products."""
+from django.core.management.base import BaseCommand
+
+from shop.images import generate_variants
+from shop.models import Product
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnail/card/detail WebP and JPEG variants for product images"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Regenerate products that already have variants")
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image="").exclude(image__isnull=True)
+        if not options["all"]:
+            products = products.filter(image_variants={})
+        done = failed = 0
+        for product_id in products.values_list("id", flat=True).iterator():
+            try:
+                generate_variants(product_id)
+                done += 1
+            except OSError as exc:
+                failed += 1
+                self.stderr.write(f"Product {product_id}: {exc}")
+        self.stdout.write(self.style.SUCCESS(f"Generated variants for {done} products ({failed} failed)."))
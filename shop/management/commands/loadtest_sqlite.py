@@ -0,0 +1,149 @@
+"""Concurrent read/write load test of SQLite: Django defaults against the configured tuning."""
+import random
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from shop.management.benchmarking import copy_sqlite, percentile
+from shop.models import Product, StockReservation
+
+# Connection settings compared; "settings" is filled in from DATABASES.
+DEFAULT_MODE = {"OPTIONS": {}, "CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False}
+
+
+class Command(BaseCommand):
+    help = "Load-test a copy of the SQLite database with concurrent readers and writers, default vs tuned settings"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default", help="Database alias whose file is copied")
+        parser.add_argument("--modes", nargs="*", default=["default", "settings"], choices=["default", "settings"])
+        parser.add_argument("--readers", type=int, default=8, help="Threads running catalog reads")
+        parser.add_argument("--writers", type=int, default=4, help="Threads running read-then-write transactions")
+        parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each run")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        source = settings.DATABASES[options["database"]]
+        if source["ENGINE"] != "django.db.backends.sqlite3":
+            raise CommandError("loadtest_sqlite only runs against an SQLite database.")
+        modes = {
+            "default": DEFAULT_MODE,
+            "settings": {
+                "OPTIONS": dict(source.get("OPTIONS", {})),
+                "CONN_MAX_AGE": source.get("CONN_MAX_AGE", 0),
+                "CONN_HEALTH_CHECKS": source.get("CONN_HEALTH_CHECKS", False),
+            },
+        }
+        workdir = Path(tempfile.mkdtemp(prefix="loadtest-sqlite-"))
+        try:
+            self.stdout.write(
+                f"{options['readers']} readers, {options['writers']} writers, {options['seconds']:.0f}s per mode"
+            )
+            self.stdout.write(
+                f"{'mode':<10} {'reads/s':>9} {'writes/s':>9} {'read p95':>9} {'write p95':>10} "
+                f"{'locked':>7} {'other':>6}"
+            )
+            for name in options["modes"]:
+                path = workdir / f"{name}.sqlite3"
+                # Each run starts from the journal mode its settings would leave.
+                copy_sqlite(source["NAME"], path, journal_mode="DELETE" if name == "default" else "WAL")
+                result = self.run(name, path, modes[name], options)
+                self.stdout.write(
+                    f"{name:<10} {result['reads'] / options['seconds']:9.0f} "
+                    f"{result['writes'] / options['seconds']:9.0f} {result['read_p95']:8.1f}ms "
+                    f"{result['write_p95']:9.1f}ms {result['locked']:7d} {result['other']:6d}"
+                )
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def run(self, name, path, mode, options):
+        alias = f"loadtest_{name}"
+        connections.settings[alias] = {"ENGINE": "django.db.backends.sqlite3", "NAME": str(path), **mode}
+        connections.configure_settings(connections.settings)
+        try:
+            ids = list(Product.objects.using(alias).values_list("id", flat=True))
+            categories = list(Product.objects.using(alias).values_list("category_id", flat=True).distinct())
+            connections[alias].close()
+            if not ids:
+                raise CommandError("The database has no products; run generate_data first.")
+            return self.drive(alias, ids, categories, options)
+        finally:
+            del connections.settings[alias]
+
+    def drive(self, alias, ids, categories, options):
+        deadline = time.perf_counter() + options["seconds"]
+        totals = {"reads": [], "writes": [], "locked": 0, "other": 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(options["readers"] + options["writers"])
+
+        def read(rng, index):
+            list(
+                Product.objects.using(alias)
+                .filter(category_id=rng.choice(categories), stock__gt=0)
+                .order_by("name")
+                .values("id", "name", "price", "stock")[:24]
+            )
+            Product.objects.using(alias).filter(id=rng.choice(ids)).values("name", "price", "stock").first()
+
+        def write(rng, index):
+            # Checkout-shaped: read availability, then hold stock and touch the product.
+            holder = f"loadtest-{index}"
+            product_id = rng.choice(ids)
+            with transaction.atomic(using=alias):
+                Product.objects.using(alias).filter(id=product_id).values_list("stock", flat=True).first()
+                StockReservation.objects.using(alias).bulk_create(
+                    [StockReservation(holder=holder, product_id=product_id, quantity=1, expires_at=timezone.now())],
+                    update_conflicts=True,
+                    unique_fields=["holder", "product"],
+                    update_fields=["quantity", "expires_at"],
+                )
+                Product.objects.using(alias).filter(id=product_id).update(stock=F("stock"), updated_at=timezone.now())
+
+        def worker(index, kind):
+            operation = read if kind == "reads" else write
+            rng = random.Random(options["seed"] + index)
+            timings, locked, other = [], 0, 0
+            barrier.wait()
+            try:
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    try:
+                        operation(rng, index)
+                        timings.append((time.perf_counter() - start) * 1000)
+                    except OperationalError as exc:
+                        if "locked" in str(exc) or "busy" in str(exc):
+                            locked += 1
+                        else:
+                            other += 1
+                    finally:
+                        # What request_finished does after every request.
+                        connections[alias].close_if_unusable_or_obsolete()
+            finally:
+                connections[alias].close()
+            with lock:
+                totals[kind].extend(timings)
+                totals["locked"] += locked
+                totals["other"] += other
+
+        kinds = ["reads"] * options["readers"] + ["writes"] * options["writers"]
+        threads = [threading.Thread(target=worker, args=(i, kind)) for i, kind in enumerate(kinds)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return {
+            "reads": len(totals["reads"]),
+            "writes": len(totals["writes"]),
+            "read_p95": percentile(totals["reads"], 95),
+            "write_p95": percentile(totals["writes"], 95),
+            "locked": totals["locked"],
+            "other": totals["other"],
+        }
@@ -0,0 +1,18 @@
+"""Rebuild the product search index."""
+from django.core.management.base import BaseCommand
+
+from shop.models import Product
+from shop.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product full-text search index"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default", help="Database alias to reindex")
+
+    def handle(self, *args, **options):
+        backend = get_search_backend(options["database"])
+        backend.rebuild()
+        count = Product.objects.using(options["database"]).count()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {type(backend).__name__} index for {count} products."))
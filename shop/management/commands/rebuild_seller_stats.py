@@ -0,0 +1,24 @@
+"""Recompute the seller analytics summary table from order items."""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.services import SellerAnalyticsService
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Rebuild SellerDailyStats from order items (all sellers, or one with --seller)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seller", help="Username of a single seller to rebuild")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        seller = None
+        if options["seller"]:
+            seller = User.objects.filter(username=options["seller"]).first()
+            if seller is None:
+                raise CommandError(f"No user named {options['seller']!r}")
+        created = SellerAnalyticsService.rebuild(seller, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} seller stats rows."))
@@ -0,0 +1,12 @@
+"""Delete expired cart stock reservations."""
+from django.core.management.base import BaseCommand
+
+from shop.services import ReservationService
+
+
+class Command(BaseCommand):
+    help = "Release stock held by expired cart reservations (run periodically, e.g. from cron)"
+
+    def handle(self, *args, **options):
+        released = ReservationService.release_expired()
+        self.stdout.write(self.style.SUCCESS(f"Released {released} expired reservations."))
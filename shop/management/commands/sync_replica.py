@@ -0,0 +1,39 @@
+"""Copy the primary SQLite database into the read replica - a local stand-in for replication."""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.management.benchmarking import copy_sqlite
+
+
+class Command(BaseCommand):
+    help = "Copy the primary database into SHOP_REPLICA_DATABASE with SQLite's backup API, once or every --interval"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default", help="Primary database alias")
+        parser.add_argument("--replica", help="Replica alias (default: SHOP_REPLICA_DATABASE)")
+        parser.add_argument("--interval", type=float, default=0,
+                            help="Seconds between copies; 0 copies once and exits")
+
+    def handle(self, *args, **options):
+        replica = options["replica"] or getattr(settings, "SHOP_REPLICA_DATABASE", None)
+        if not replica:
+            raise CommandError("No replica: set SHOP_REPLICA_DATABASE or pass --replica.")
+        source, target = (self.sqlite_path(alias) for alias in (options["database"], replica))
+        while True:
+            start = time.perf_counter()
+            # Replica readers hold brief shared locks; wait for them.
+            pages = copy_sqlite(source, target, timeout=30)
+            self.stdout.write(f"Copied {pages} pages to {replica} in {(time.perf_counter() - start) * 1000:.0f}ms")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
+
+    def sqlite_path(self, alias):
+        if alias not in settings.DATABASES:
+            raise CommandError(f"Unknown database alias: {alias}")
+        database = settings.DATABASES[alias]
+        if database["ENGINE"] != "django.db.backends.sqlite3":
+            raise CommandError(f"{alias} is not an SQLite database; use the backend's own replication.")
+        return str(database["NAME"])
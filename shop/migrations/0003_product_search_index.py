@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from shop.search import get_search_backend
+    get_search_backend(schema_editor.connection.alias).rebuild()
+
+
+def uninstall_search_index(apps, schema_editor):
+    from shop.search import get_search_backend
+    backend = get_search_backend(schema_editor.connection.alias)
+    if hasattr(backend, "uninstall"):
+        backend.uninstall()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0002_alter_product_image_alter_product_seller_order_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def populate_seller_stats(apps, schema_editor):
+    OrderItem = apps.get_model('shop', 'OrderItem')
+    SellerDailyStats = apps.get_model('shop', 'SellerDailyStats')
+    db = schema_editor.connection.alias
+    rows = (
+        OrderItem.objects.using(db)
+        .annotate(day=TruncDate('order__created_at'))
+        .values('seller_id', 'product_id', 'day')
+        .annotate(
+            n_orders=Count('order_id', distinct=True),
+            n_units=Sum('quantity'),
+            total=Sum(F('quantity') * F('price'), output_field=DecimalField(max_digits=14, decimal_places=2)),
+        )
+        .order_by()
+    )
+    batch = []
+    for row in rows.iterator(chunk_size=1000):
+        batch.append(SellerDailyStats(
+            seller_id=row['seller_id'], product_id=row['product_id'], day=row['day'],
+            orders=row['n_orders'], units=row['n_units'], revenue=row['total'],
+        ))
+        if len(batch) >= 1000:
+            SellerDailyStats.objects.using(db).bulk_create(batch)
+            batch = []
+    SellerDailyStats.objects.using(db).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0005_hot_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SellerDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='shop.product')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Seller daily stats',
+                'indexes': [models.Index(fields=['seller', 'day'], name='sellerstats_seller_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('seller', 'product', 'day'), name='unique_seller_product_day')],
+            },
+        ),
+        migrations.RunPython(populate_seller_stats, migrations.RunPython.noop),
+    ]
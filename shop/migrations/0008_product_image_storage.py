@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:28
+
+import shop.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0007_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=shop.storage.product_image_storage, upload_to='products/'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Variant formats whose entries are file names (shop.images.VARIANT_FORMATS).
+VARIANT_FORMATS = ('webp', 'jpeg')
+
+
+def link_existing_files(apps, schema_editor):
+    Product = apps.get_model('shop', 'Product')
+    ProductFile = apps.get_model('shop', 'ProductFile')
+    db = schema_editor.connection.alias
+    batch = []
+    for product_id, image, variants in Product.objects.using(db).values_list('id', 'image', 'image_variants').iterator():
+        names = {image} if image else set()
+        names |= {
+            name
+            for entry in (variants or {}).values()
+            for fmt, name in entry.items()
+            if fmt in VARIANT_FORMATS
+        }
+        batch.extend(ProductFile(product_id=product_id, name=name) for name in names)
+        if len(batch) >= 1000:
+            ProductFile.objects.using(db).bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    ProductFile.objects.using(db).bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0009_cart'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(db_index=True, max_length=255)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='files', to='shop.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('product', 'name'), name='unique_product_file')],
+            },
+        ),
+        migrations.RunPython(link_existing_files, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,9 @@
 """Shop models - electronic components catalog (SOLID: Open/Closed)."""
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 
 from .constants import WILAYAS, PAYMENT_METHODS
+from .storage import product_image_storage
 
 
 class Category(models.Model):
@@ -30,7 +31,9 @@ class Product(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField(default=0)
-    image = models.ImageField(upload_to="products/", blank=True, null=True)
+    image = models.ImageField(upload_to="products/", storage=product_image_storage, blank=True, null=True)
+    # Resized copies of image, filled in by shop.images after upload.
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     seller = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -41,14 +44,104 @@ class Product(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Storefront grid and listings: in-stock products by category, then name.
+            models.Index(
+                fields=["category", "name"],
+                condition=models.Q(stock__gt=0),
+                name="product_instock_cat_name_idx",
+            ),
+            # Seller dashboard: a seller's products, newest first.
+            models.Index(fields=["seller", "-created_at"], name="product_seller_created_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # One transaction with the ProductFile rows the signals write. On
+        # SQLite (BEGIN IMMEDIATE) it also holds the write lock while an
+        # upload is matched to an existing blob, so no release can delete it.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def in_stock(self):
         return self.stock > 0
 
 
+class StockReservation(models.Model):
+    """Time-limited hold on product stock for one cart."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="reservations")
+    holder = models.CharField(max_length=64)
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["holder", "product"], name="unique_reservation_per_cart"),
+        ]
+        indexes = [
+            models.Index(fields=["product", "expires_at"], name="reservation_product_exp_idx"),
+            models.Index(fields=["expires_at"], name="reservation_expires_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} for {self.holder}"
+
+
+class ProductFile(models.Model):
+    """A stored media file (image or variant) a product points at.
+
+    The reference table of content-addressed storage: a blob is deleted
+    only once no row names it (shop.storage.release_files).
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="files")
+    name = models.CharField(max_length=255, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "name"], name="unique_product_file"),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class Cart(models.Model):
+    """Persistent cart of a signed-in user; anonymous carts live in the session.
+
+    The user is the primary key, so cart items are looked up by user id
+    without joining this table.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="cart"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Cart of {self.user_id}"
+
+
+class CartItem(models.Model):
+    """One product line of a Cart - quantity changes are upserts on (cart, product)."""
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name="items")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="cart_items")
+    quantity = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            # Also the index behind "all lines of a cart".
+            models.UniqueConstraint(fields=["cart", "product"], name="unique_cart_product"),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} in cart {self.cart_id}"
+
+
 class Order(models.Model):
     """Order - buyer contact info, payment, total."""
     user = models.ForeignKey(
@@ -67,6 +160,9 @@ class Order(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="order_created_idx"),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} - {self.user.username}"
@@ -84,10 +180,46 @@ class OrderItem(models.Model):
     quantity = models.PositiveIntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        indexes = [
+            # Seller order history: a seller's lines grouped by order.
+            models.Index(fields=["seller", "order"], name="orderitem_seller_order_idx"),
+        ]
+
     def subtotal(self):
         return self.quantity * self.price
 
 
+class SellerDailyStats(models.Model):
+    """Sales of one product on one day - summary table behind seller analytics.
+
+    Checkout adds to it incrementally; `rebuild_seller_stats` recomputes it
+    from order items.
+    """
+    seller = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="daily_stats"
+    )
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="daily_stats")
+    day = models.DateField()
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = "Seller daily stats"
+        constraints = [
+            models.UniqueConstraint(fields=["seller", "product", "day"], name="unique_seller_product_day"),
+        ]
+        indexes = [
+            models.Index(fields=["seller", "day"], name="sellerstats_seller_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} on {self.day}: {self.units} units"
+
+
 class Payment(models.Model):
     """Payment record - user, amount, method, order link."""
     user = models.ForeignKey(
@@ -0,0 +1,144 @@
+"""Keyset (cursor) pagination - constant cost per page, however deep."""
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldError, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded for the paginator's ordering."""
+
+
+def clamp_page_size(value, default=None):
+    """Page size from a request parameter, limited to SHOP_MAX_PAGE_SIZE."""
+    default = default or getattr(settings, "SHOP_PAGE_SIZE", 24)
+    maximum = getattr(settings, "SHOP_MAX_PAGE_SIZE", 100)
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, maximum))
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder that keeps microseconds, so datetime positions are exact."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPage:
+    """One page of results and the cursor for the next one."""
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """Paginate a queryset by seeking past the last row of the previous page.
+
+    ``ordering`` lists the sort fields ("-" prefix for descending), and its
+    last field must be unique (usually "id") so every row has a distinct
+    position. Cursors are opaque, URL-safe encodings of that position.
+    A values() queryset must include the ordering fields.
+    """
+
+    def __init__(self, queryset, ordering, page_size):
+        self.queryset = queryset
+        self.ordering = list(ordering)
+        self.page_size = page_size
+
+    @staticmethod
+    def _field(term):
+        return term.lstrip("-")
+
+    def encode_cursor(self, obj):
+        values = []
+        for term in self.ordering:
+            if isinstance(obj, dict):
+                # values() rows are keyed by the lookup itself.
+                values.append(obj[self._field(term)])
+                continue
+            value = obj
+            for attr in self._field(term).split("__"):
+                value = getattr(value, attr)
+            values.append(value)
+        raw = json.dumps(values, cls=CursorEncoder, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        except (ValueError, TypeError) as exc:
+            raise InvalidCursor(cursor) from exc
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise InvalidCursor(cursor)
+        try:
+            return [self._to_python(self._field(term), value) for term, value in zip(self.ordering, values)]
+        except (ValidationError, TypeError, ValueError) as exc:
+            raise InvalidCursor(cursor) from exc
+
+    def _output_field(self, name):
+        """Model field (or annotation output field) an ordering term sorts by, if known."""
+        annotation = self.queryset.query.annotations.get(name)
+        if annotation is not None:
+            try:
+                return annotation.output_field
+            except FieldError:
+                return None
+        opts, field = self.queryset.model._meta, None
+        for part in name.split("__"):
+            field = opts.get_field(part)
+            if field.is_relation:
+                opts = field.related_model._meta
+        return field
+
+    def _to_python(self, name, value):
+        """Cursor value checked and converted for the field it is compared with."""
+        field = self._output_field(name)
+        if value is None and not getattr(field, "null", False):
+            raise ValueError(f"{name} cannot be null")
+        if isinstance(value, (list, dict)):
+            raise TypeError(f"{name} must be a scalar")
+        return field.to_python(value) if field is not None else value
+
+    def seek_filter(self, values):
+        """Q selecting rows strictly after the position given by values."""
+        condition = Q()
+        equal = Q()
+        for term, value in zip(self.ordering, values):
+            field = self._field(term)
+            lookup = "lt" if term.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{field}__{lookup}": value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def get_page(self, cursor=None):
+        """Page after cursor (first page when cursor is empty)."""
+        queryset = self.queryset.order_by(*self.ordering)
+        if cursor:
+            queryset = queryset.filter(self.seek_filter(self.decode_cursor(cursor)))
+        rows = list(queryset[: self.page_size + 1])
+        next_cursor = None
+        if len(rows) > self.page_size:
+            rows = rows[: self.page_size]
+            next_cursor = self.encode_cursor(rows[-1])
+        return KeysetPage(rows, next_cursor)
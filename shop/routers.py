@@ -0,0 +1,98 @@
+"""Read-replica routing for catalog reads.
+
+With ``SHOP_REPLICA_DATABASE`` set to a DATABASES alias, Category and
+Product reads in safe (GET/HEAD/OPTIONS) requests go to that replica;
+everything else, and every write, stays on the primary. A request is
+pinned to the primary when:
+
+- it is unsafe (POST, ...), or the client made an unsafe request in the
+  last ``SHOP_REPLICA_PIN_SECONDS`` (cookie), so redirects after a write
+  read their own writes despite replication lag;
+- the view runs under ``read_from_primary()`` (order success, seller pages);
+- the query runs inside a transaction on the primary.
+
+Outside a request (management commands, background threads) nothing is
+routed to the replica. Unset, the router and middleware do nothing.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Models whose reads may be served by the replica.
+CATALOG_MODELS = {"shop.category", "shop.product"}
+PIN_COOKIE = "shop_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Whether the current request may read the catalog from the replica.
+_replica_reads = ContextVar("shop_replica_reads", default=False)
+
+
+def get_replica_alias():
+    return getattr(settings, "SHOP_REPLICA_DATABASE", None)
+
+
+@contextmanager
+def read_from_primary():
+    """Route all reads in the block (or decorated view) to the primary."""
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class CatalogReplicaRouter:
+    """Send unpinned catalog reads to the replica; everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        replica = get_replica_alias()
+        if not replica:
+            return None
+        if (
+            _replica_reads.get()
+            and model._meta.label_lower in CATALOG_MODELS
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return replica
+        # Explicit, so related lookups from a replica instance do not follow it there.
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Explicit, so saving an instance loaded from the replica writes to the primary.
+        return DEFAULT_DB_ALIAS if get_replica_alias() else None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        replica = get_replica_alias()
+        if replica and {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, replica}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary (sync_replica), never migrated itself.
+        if db == get_replica_alias():
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Allow replica reads for safe requests that are not pinned to the primary."""
+
+    def __init__(self, get_response):
+        if not get_replica_alias():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, "SHOP_REPLICA_PIN_SECONDS", 5)
+
+    def __call__(self, request):
+        safe = request.method in SAFE_METHODS
+        token = _replica_reads.set(safe and PIN_COOKIE not in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica_reads.reset(token)
+        if not safe:
+            response.set_cookie(PIN_COOKIE, "1", max_age=self.pin_seconds, httponly=True, samesite="Lax")
+        return response
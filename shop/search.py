@@ -0,0 +1,133 @@
+"""Product search - SQLite FTS5 index with a LIKE fallback for other databases."""
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(q):
+    """Split a search string into lowercase word tokens ("hc-sr04" -> hc, sr04)."""
+    return [t.lower() for t in TOKEN_RE.findall(q)]
+
+
+class BasicSearchBackend:
+    """Portable search with icontains; name hits rank ahead of description hits.
+
+    Every token must appear in the name or the description. Ranks are
+    ascending (lower is better) to match the FTS5 backend.
+    """
+
+    def __init__(self, using="default"):
+        self.using = using
+
+    def search(self, queryset, q):
+        """Filter queryset to matches of q and annotate search_rank."""
+        tokens = tokenize(q)
+        if not tokens:
+            return self.no_results(queryset)
+        for token in tokens:
+            queryset = queryset.filter(Q(name__icontains=token) | Q(description__icontains=token))
+        return queryset.annotate(
+            search_rank=Case(
+                When(name__icontains=tokens[0], then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        )
+
+    def no_results(self, queryset):
+        """Empty result that still carries search_rank for ordering."""
+        return queryset.annotate(search_rank=Value(0, output_field=IntegerField())).none()
+
+    def install(self):
+        """Nothing to install for the fallback backend."""
+
+    def rebuild(self):
+        """Nothing to rebuild for the fallback backend."""
+
+
+class SQLiteFTSSearchBackend(BasicSearchBackend):
+    """SQLite FTS5 index over Product name and description.
+
+    The index is an external-content FTS5 table kept in sync by triggers on
+    shop_product, so bulk inserts and raw updates are indexed too. Each token
+    is matched as a prefix and results are ranked with bm25, weighting name
+    matches above description matches.
+    """
+
+    TABLE = "shop_product_fts"
+    CONTENT_TABLE = "shop_product"
+    NAME_WEIGHT = 10.0
+    DESCRIPTION_WEIGHT = 1.0
+
+    def match_expression(self, q):
+        """FTS5 MATCH expression requiring a prefix match for every token."""
+        return " AND ".join(f'"{token}"*' for token in tokenize(q))
+
+    def search(self, queryset, q):
+        match = self.match_expression(q)
+        if not match:
+            return self.no_results(queryset)
+        table = self.TABLE
+        rank_sql = (
+            f"SELECT bm25({table}, {self.NAME_WEIGHT}, {self.DESCRIPTION_WEIGHT}) FROM {table} "
+            f"WHERE {table} MATCH %s AND {table}.rowid = {self.CONTENT_TABLE}.id"
+        )
+        return queryset.filter(
+            id__in=RawSQL(f"SELECT rowid FROM {table} WHERE {table} MATCH %s", (match,))
+        ).annotate(search_rank=RawSQL(rank_sql, (match,)))
+
+    def install_statements(self):
+        """DDL for the FTS table and its sync triggers; safe to run repeatedly."""
+        table, content = self.TABLE, self.CONTENT_TABLE
+        insert = f"INSERT INTO {table}(rowid, name, description) VALUES (new.id, new.name, new.description);"
+        delete = (
+            f"INSERT INTO {table}({table}, rowid, name, description) "
+            f"VALUES ('delete', old.id, old.name, old.description);"
+        )
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+            f"name, description, content='{content}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON {content} BEGIN {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON {content} BEGIN {delete} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE OF name, description ON {content} "
+            f"BEGIN {delete} {insert} END",
+        ]
+
+    def install(self):
+        """Create the index and triggers if missing.
+
+        Triggers are dropped whenever a migration rebuilds shop_product on
+        SQLite, so this also runs after every migrate.
+        """
+        with connections[self.using].cursor() as cursor:
+            for statement in self.install_statements():
+                cursor.execute(statement)
+
+    def uninstall(self):
+        with connections[self.using].cursor() as cursor:
+            for suffix in ("_ai", "_ad", "_au"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {self.TABLE}{suffix}")
+            cursor.execute(f"DROP TABLE IF EXISTS {self.TABLE}")
+
+    def rebuild(self):
+        """Reindex every product from shop_product."""
+        self.install()
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f"INSERT INTO {self.TABLE}({self.TABLE}) VALUES ('rebuild')")
+
+
+def get_search_backend(using="default"):
+    """Backend from SHOP_SEARCH_BACKEND, or FTS5 on SQLite and LIKE elsewhere."""
+    path = getattr(settings, "SHOP_SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)(using)
+    if connections[using].vendor == "sqlite":
+        return SQLiteFTSSearchBackend(using)
+    return BasicSearchBackend(using)
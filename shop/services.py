@@ -1,6 +1,16 @@
-"""Shop services - ProductService, CartService, OrderService (Business Logic)."""
+"""Shop services - ProductService, ReservationService, CartService, OrderService, SellerAnalyticsService (Business Logic)."""
+import uuid
+from datetime import timedelta
 from decimal import Decimal
 from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Case, Count, DecimalField, F, IntegerField, OuterRef, PositiveIntegerField, Prefetch, Q, Subquery, Sum, Value,
+    When, Window,
+)
+from django.db.models.functions import Coalesce, RowNumber, TruncDate
+from django.utils import timezone
+from django.utils.functional import cached_property
 
 User = settings.AUTH_USER_MODEL
 
@@ -8,19 +18,114 @@ User = settings.AUTH_USER_MODEL
 class ProductService:
     """Product creation, retrieval, validation."""
 
+    # Cards per category on the default storefront grid.
+    PER_CATEGORY_LIMIT = 6
+
     @staticmethod
     def create_product(form, seller):
-        """Create product with seller."""
-        from .models import Product
+        """Create product with seller; image variants are generated in the background."""
+        from .images import schedule_variants
         product = form.save(commit=False)
         product.seller = seller
         product.save()
+        if product.image:
+            schedule_variants(product)
+        return product
+
+    @staticmethod
+    def update_product(form):
+        """Save an edited product; a new or cleared image resets its variants."""
+        from .images import schedule_variants
+        product = form.save(commit=False)
+        if "image" in form.changed_data:
+            # Until the new variants exist, templates fall back to the original;
+            # the old files are released by the post_save signal.
+            product.image_variants = {}
+        product.save()
+        if "image" in form.changed_data and product.image:
+            schedule_variants(product)
         return product
 
+    @staticmethod
+    def search_products(q="", cat=""):
+        """In-stock products matching q and cat, with their sort order within a category.
+
+        Search results are ranked best match first; otherwise products sort
+        by name.
+        """
+        from .models import Product
+        from .search import get_search_backend
+        products_qs = Product.objects.filter(stock__gt=0).select_related("category", "seller")
+        order = ["search_rank", "name"] if q else ["name"]
+        if q:
+            products_qs = get_search_backend().search(products_qs, q)
+        if cat:
+            products_qs = products_qs.filter(category__slug=cat)
+        return products_qs, order
+
+    @staticmethod
+    def group_by_category(products):
+        """Group products into {(category id, name, slug): [products]} preserving order."""
+        products_by_category = {}
+        for p in products:
+            key = (p.category.id, p.category.name, p.category.slug)
+            products_by_category.setdefault(key, []).append(p)
+        return products_by_category
+
+    @staticmethod
+    def top_products(q=""):
+        """Queryset of the top PER_CATEGORY_LIMIT products of every category.
+
+        The limit is a ROW_NUMBER() window in SQL, so only the cards shown
+        are ever loaded.
+        """
+        products_qs, order = ProductService.search_products(q)
+        return products_qs.order_by("category__name", *order).annotate(
+            category_rank=Window(RowNumber(), partition_by=F("category_id"), order_by=[F(f).asc() for f in order])
+        ).filter(category_rank__lte=ProductService.PER_CATEGORY_LIMIT)
+
+    @staticmethod
+    def get_products_by_category(q=""):
+        """Top products of every category for the storefront grid, grouped."""
+        return ProductService.group_by_category(ProductService.top_products(q))
+
+    @staticmethod
+    def get_product_page(q="", cat="", cursor=None, page_size=None):
+        """One keyset page of products ordered by category, then rank/name, then id.
+
+        Raises InvalidCursor for a malformed cursor.
+        """
+        from .pagination import KeysetPaginator, clamp_page_size
+        products_qs, order = ProductService.search_products(q, cat)
+        paginator = KeysetPaginator(products_qs, ["category__name", *order, "id"], clamp_page_size(page_size))
+        return paginator.get_page(cursor)
+
+    @staticmethod
+    def get_product_values_page(lookups, q="", cat="", cursor=None, page_size=None):
+        """get_product_page as values() dicts of lookups (plus the sort keys), for the JSON API."""
+        from .pagination import KeysetPaginator, clamp_page_size
+        products_qs, order = ProductService.search_products(q, cat)
+        ordering = ["category__name", *order, "id"]
+        products_qs = products_qs.values(*dict.fromkeys([*lookups, *ordering]))
+        paginator = KeysetPaginator(products_qs, ordering, clamp_page_size(page_size))
+        return paginator.get_page(cursor)
+
+    @staticmethod
+    def get_seller_product_page(seller, cursor=None, page_size=None):
+        """One keyset page of a seller's products, newest first, without descriptions.
+
+        Raises InvalidCursor for a malformed cursor.
+        """
+        from .models import Product
+        from .pagination import KeysetPaginator, clamp_page_size
+        products_qs = Product.objects.filter(seller=seller).only("name", "slug", "stock", "created_at")
+        paginator = KeysetPaginator(products_qs, ["-created_at", "-id"], clamp_page_size(page_size))
+        return paginator.get_page(cursor)
+
     @staticmethod
     def validate_stock(product, quantity):
-        """Check product availability."""
-        return product and product.stock >= quantity and quantity > 0
+        """Check product availability, net of other carts' holds when annotated."""
+        return product and getattr(product, "available", product.stock) >= quantity and quantity > 0
 
     @staticmethod
     def is_available(product):
@@ -28,22 +133,396 @@ class ProductService:
         return product and product.stock > 0
 
 
+class ReservationService:
+    """Time-limited stock holds (StockReservation) created by cart changes."""
+
+    @staticmethod
+    def get_ttl():
+        return timedelta(seconds=getattr(settings, "SHOP_RESERVATION_TTL", 15 * 60))
+
+    @staticmethod
+    def held_elsewhere(holder=None, now=None):
+        """Units of the outer product held by other carts' unexpired reservations."""
+        from .models import StockReservation
+        held = (
+            StockReservation.objects.filter(product=OuterRef("pk"), expires_at__gt=now or timezone.now())
+            .exclude(holder=holder)
+            .values("product")
+            .annotate(total=Sum("quantity"))
+            .values("total")
+        )
+        return Coalesce(Subquery(held), 0, output_field=IntegerField())
+
+    @classmethod
+    def with_availability(cls, queryset, holder=None):
+        """Annotate ``available``: stock minus what other carts hold."""
+        return queryset.annotate(available=F("stock") - cls.held_elsewhere(holder))
+
+    # bulk_create arguments turning the INSERT into an upsert on (holder, product).
+    HOLD_UPSERT = {
+        "update_conflicts": True,
+        "unique_fields": ["holder", "product"],
+        "update_fields": ["quantity", "expires_at"],
+    }
+
+    @classmethod
+    def _holds(cls, holder, quantities):
+        from .models import StockReservation
+        expires_at = timezone.now() + cls.get_ttl()
+        return [
+            StockReservation(holder=holder, product_id=product_id, quantity=quantity, expires_at=expires_at)
+            for product_id, quantity in quantities.items()
+        ]
+
+    @classmethod
+    def hold(cls, holder, product_id, quantity):
+        """Create or refresh holder's reservation for a product (single upsert)."""
+        cls.hold_many(holder, {product_id: quantity})
+
+    @classmethod
+    async def ahold(cls, holder, product_id, quantity):
+        from .models import StockReservation
+        await StockReservation.objects.abulk_create(cls._holds(holder, {product_id: quantity}), **cls.HOLD_UPSERT)
+
+    @classmethod
+    def hold_many(cls, holder, quantities):
+        """Create or refresh holder's reservations for {product_id: quantity} (single upsert)."""
+        from .models import StockReservation
+        if quantities:
+            StockReservation.objects.bulk_create(cls._holds(holder, quantities), **cls.HOLD_UPSERT)
+
+    @staticmethod
+    def _held_by(holder, product_ids=None):
+        from .models import StockReservation
+        reservations = StockReservation.objects.filter(holder=holder)
+        if product_ids is not None:
+            reservations = reservations.filter(product_id__in=product_ids)
+        return reservations
+
+    @classmethod
+    def release(cls, holder, product_ids=None):
+        """Drop holder's reservations, optionally only for some products."""
+        cls._held_by(holder, product_ids).delete()
+
+    @classmethod
+    async def arelease(cls, holder, product_ids=None):
+        await cls._held_by(holder, product_ids).adelete()
+
+    @staticmethod
+    def release_expired(now=None):
+        """Delete expired reservations; returns how many were removed."""
+        from .models import StockReservation
+        deleted, _ = StockReservation.objects.filter(expires_at__lte=now or timezone.now()).delete()
+        return deleted
+
+
+class CartSummary:
+    """Per-request, lazily evaluated view of the cart.
+
+    ``count`` is read straight from the session (one query for a signed-in
+    user's cart) and never hydrates products; ``items`` and ``total``
+    hydrate products on first access and are reused for the rest of the
+    request. Hydrating prunes lines the cart page leaves out (deleted or
+    out-of-stock products), so the stored lines, and with them the header
+    badge, agree with the cart page.
+    """
+
+    def __init__(self, request):
+        self._request = request
+
+    async def aprefetch(self, hydrate=False):
+        """Evaluate count (and with hydrate, items and total) with the async ORM.
+
+        Async views call this before rendering, since templates may not
+        query the database from an event loop.
+        """
+        if "count" in self.__dict__ and (not hydrate or "_hydrated" in self.__dict__):
+            return
+        if not hydrate:
+            cart = await CartService.aget_cart(self._request)
+            self.__dict__["count"] = sum(qty for qty in cart.values() if isinstance(qty, int))
+            return
+        dropped = []
+        if CartService.uses_db(self._request):
+            hydrated = await CartService.aload_user_cart_items(self._request.user, dropped=dropped)
+        else:
+            cart = await CartService.aget_cart(self._request)
+            hydrated = await CartService.aload_cart_items(cart, dropped=dropped)
+        if dropped:
+            await CartService.aprune_lines(self._request, dropped)
+            setattr(self._request, CartService.SUMMARY_ATTR, self)
+        self._set_hydrated(hydrated)
+
+    @cached_property
+    def count(self):
+        return sum(qty for qty in CartService.get_cart(self._request).values() if isinstance(qty, int))
+
+    @cached_property
+    def _hydrated(self):
+        dropped = []
+        if CartService.uses_db(self._request):
+            hydrated = CartService.load_user_cart_items(self._request.user, dropped=dropped)
+        else:
+            hydrated = CartService.load_cart_items(CartService.get_cart(self._request), dropped=dropped)
+        if dropped:
+            CartService.prune_lines(self._request, dropped)
+            setattr(self._request, CartService.SUMMARY_ATTR, self)
+        self._set_hydrated(hydrated)
+        return hydrated
+
+    def _set_hydrated(self, hydrated):
+        """Store hydrated (items, total); the count is now that of the pruned lines."""
+        self.__dict__["_hydrated"] = hydrated
+        self.__dict__["count"] = sum(item["quantity"] for item in hydrated[0])
+
+    @property
+    def items(self):
+        return self._hydrated[0]
+
+    @property
+    def total(self):
+        return self._hydrated[1]
+
+    def __bool__(self):
+        return self.count > 0
+
+
 class CartService:
-    """Session-based cart - add/remove, totals, stock validation."""
+    """Cart - add/remove, totals, stock validation, stock holds.
+
+    Anonymous carts live in the session; signed-in users' carts are Cart /
+    CartItem rows, so they follow the user across devices. The session cart
+    is merged into the user's cart on login. Methods prefixed with ``a``
+    are the async equivalents used by shop.async_views; they expect
+    request.user to be resolved already (``await request.auser()``).
+    """
 
     CART_KEY = "cart"
+    HOLDER_KEY = "cart_holder"
+    SUMMARY_ATTR = "_cart_summary"
+    # Upper bound on queries issued by get_cart_items, independent of cart size.
+    CART_ITEMS_MAX_QUERIES = 1
+
+    @staticmethod
+    def encode_cart(cart):
+        """Compact session form of a cart: "12:3,45:1" (product id:quantity)."""
+        return ",".join(f"{pid}:{qty}" for pid, qty in cart.items())
+
+    @staticmethod
+    def decode_cart(value):
+        """Cart dict {"12": 3, ...} from encode_cart output (or a legacy dict)."""
+        if isinstance(value, dict):
+            return dict(value)
+        cart = {}
+        for entry in (value or "").split(","):
+            pid, _, qty = entry.partition(":")
+            if pid.isdigit() and qty.isdigit():
+                cart[pid] = int(qty)
+        return cart
+
+    @staticmethod
+    def uses_db(request):
+        """Whether the request's cart is stored in the database (signed-in user)."""
+        user = getattr(request, "user", None)
+        return bool(user and user.is_authenticated)
 
     @classmethod
     def get_cart(cls, request):
-        """Get cart from session."""
-        cart = request.session.get(cls.CART_KEY, {})
-        return dict(cart)
+        """Get cart as {"product id": quantity} from the session or the user's Cart."""
+        if cls.uses_db(request):
+            from .models import CartItem
+            lines = CartItem.objects.filter(cart_id=request.user.pk).values_list("product_id", "quantity")
+            return {str(pid): qty for pid, qty in lines}
+        return cls.decode_cart(request.session.get(cls.CART_KEY))
+
+    @classmethod
+    async def aget_cart(cls, request):
+        if cls.uses_db(request):
+            from .models import CartItem
+            lines = CartItem.objects.filter(cart_id=request.user.pk).values_list("product_id", "quantity")
+            return {str(pid): qty async for pid, qty in lines}
+        return cls.decode_cart(await request.session.aget(cls.CART_KEY))
+
+    @classmethod
+    def save_cart(cls, request, cart):
+        """Store cart in session and drop the memoized summary.
+
+        The session is only marked modified (and rewritten) when the
+        encoded cart actually changed.
+        """
+        encoded = cls.encode_cart(cart)
+        if request.session.get(cls.CART_KEY) != encoded:
+            request.session[cls.CART_KEY] = encoded
+        setattr(request, cls.SUMMARY_ATTR, None)
+
+    @classmethod
+    async def asave_cart(cls, request, cart):
+        encoded = cls.encode_cart(cart)
+        if await request.session.aget(cls.CART_KEY) != encoded:
+            await request.session.aset(cls.CART_KEY, encoded)
+        setattr(request, cls.SUMMARY_ATTR, None)
+
+    @staticmethod
+    def user_holder(user):
+        """Reservation token of a user's database cart, shared by all their devices."""
+        return f"user:{user.pk}"
+
+    @staticmethod
+    def touch_cart(user):
+        """Create the user's Cart or bump its updated_at (single upsert)."""
+        from .models import Cart
+        Cart.objects.bulk_create(
+            [Cart(user=user)], update_conflicts=True, unique_fields=["user"], update_fields=["updated_at"]
+        )
+
+    @staticmethod
+    async def atouch_cart(user):
+        from .models import Cart
+        await Cart.objects.abulk_create(
+            [Cart(user=user)], update_conflicts=True, unique_fields=["user"], update_fields=["updated_at"]
+        )
+
+    @classmethod
+    def set_line(cls, request, product_id, quantity):
+        """Store one cart line; an upsert on (cart, product) for database carts."""
+        if cls.uses_db(request):
+            from .models import CartItem
+            cls.touch_cart(request.user)
+            CartItem.objects.bulk_create(
+                [CartItem(cart_id=request.user.pk, product_id=product_id, quantity=quantity)],
+                update_conflicts=True,
+                unique_fields=["cart", "product"],
+                update_fields=["quantity"],
+            )
+            setattr(request, cls.SUMMARY_ATTR, None)
+            return
+        cart = cls.get_cart(request)
+        cart[str(product_id)] = quantity
+        cls.save_cart(request, cart)
+
+    @classmethod
+    async def aset_line(cls, request, product_id, quantity):
+        if cls.uses_db(request):
+            from .models import CartItem
+            await cls.atouch_cart(request.user)
+            await CartItem.objects.abulk_create(
+                [CartItem(cart_id=request.user.pk, product_id=product_id, quantity=quantity)],
+                update_conflicts=True,
+                unique_fields=["cart", "product"],
+                update_fields=["quantity"],
+            )
+            setattr(request, cls.SUMMARY_ATTR, None)
+            return
+        cart = await cls.aget_cart(request)
+        cart[str(product_id)] = quantity
+        await cls.asave_cart(request, cart)
+
+    @classmethod
+    def delete_lines(cls, request, product_ids=None):
+        """Remove some cart lines, or all of them."""
+        if cls.uses_db(request):
+            from .models import CartItem
+            lines = CartItem.objects.filter(cart_id=request.user.pk)
+            if product_ids is not None:
+                lines = lines.filter(product_id__in=product_ids)
+            lines.delete()
+            setattr(request, cls.SUMMARY_ATTR, None)
+            return
+        cart = {} if product_ids is None else cls.get_cart(request)
+        for product_id in product_ids or ():
+            cart.pop(str(product_id), None)
+        cls.save_cart(request, cart)
+
+    @classmethod
+    async def adelete_lines(cls, request, product_ids=None):
+        if cls.uses_db(request):
+            from .models import CartItem
+            lines = CartItem.objects.filter(cart_id=request.user.pk)
+            if product_ids is not None:
+                lines = lines.filter(product_id__in=product_ids)
+            await lines.adelete()
+            setattr(request, cls.SUMMARY_ATTR, None)
+            return
+        cart = {} if product_ids is None else await cls.aget_cart(request)
+        for product_id in product_ids or ():
+            cart.pop(str(product_id), None)
+        await cls.asave_cart(request, cart)
+
+    @classmethod
+    def merge_session_cart(cls, request, user):
+        """Move the anonymous session cart into user's Cart, adding quantities.
+
+        Lines are capped at the product's stock and unknown products are
+        dropped; the session's stock holds move to the user's holder.
+        """
+        from .models import CartItem, Product
+        cart = cls.decode_cart(request.session.get(cls.CART_KEY))
+        session_holder = request.session.get(cls.HOLDER_KEY)
+        if not cart:
+            return
+        with transaction.atomic():
+            stock = dict(Product.objects.filter(id__in=[int(pid) for pid in cart]).values_list("id", "stock"))
+            current = dict(CartItem.objects.filter(cart_id=user.pk).values_list("product_id", "quantity"))
+            merged = {}
+            for pid, qty in cart.items():
+                quantity = min(current.get(int(pid), 0) + qty, stock.get(int(pid), 0))
+                if quantity > 0:
+                    merged[int(pid)] = quantity
+            if merged:
+                cls.touch_cart(user)
+                CartItem.objects.bulk_create(
+                    [CartItem(cart_id=user.pk, product_id=pid, quantity=qty) for pid, qty in merged.items()],
+                    update_conflicts=True,
+                    unique_fields=["cart", "product"],
+                    update_fields=["quantity"],
+                )
+                ReservationService.hold_many(cls.user_holder(user), merged)
+            if session_holder:
+                ReservationService.release(session_holder)
+        request.session.pop(cls.CART_KEY, None)
+        request.session.pop(cls.HOLDER_KEY, None)
+        setattr(request, cls.SUMMARY_ATTR, None)
+
+    @classmethod
+    def get_holder(cls, request, create=False):
+        """Token identifying this cart's stock reservations.
+
+        Kept in the session rather than using the session key, which changes
+        on login. A signed-in user's cart uses user_holder().
+        """
+        if cls.uses_db(request):
+            return cls.user_holder(request.user)
+        holder = request.session.get(cls.HOLDER_KEY)
+        if holder is None and create:
+            holder = uuid.uuid4().hex
+            request.session[cls.HOLDER_KEY] = holder
+        return holder
+
+    @classmethod
+    async def aget_holder(cls, request, create=False):
+        if cls.uses_db(request):
+            return cls.user_holder(request.user)
+        holder = await request.session.aget(cls.HOLDER_KEY)
+        if holder is None and create:
+            holder = uuid.uuid4().hex
+            await request.session.aset(cls.HOLDER_KEY, holder)
+        return holder
+
+    @classmethod
+    def get_summary(cls, request):
+        """Get the request's CartSummary, created once per request."""
+        summary = getattr(request, cls.SUMMARY_ATTR, None)
+        if summary is None:
+            summary = CartSummary(request)
+            setattr(request, cls.SUMMARY_ATTR, summary)
+        return summary
 
     @classmethod
     def add_item(cls, request, product_id, quantity=1):
-        """Add item to cart with stock validation."""
+        """Add item to cart with stock validation and hold the stock."""
         from .models import Product
-        product = Product.objects.filter(id=product_id).first()
+        holder = cls.get_holder(request, create=True)
+        product = ReservationService.with_availability(Product.objects.filter(id=product_id), holder).first()
         if not ProductService.validate_stock(product, quantity):
             return False, "Invalid stock"
         cart = cls.get_cart(request)
@@ -52,100 +531,469 @@ class CartService:
         new_qty = current + quantity
         if not ProductService.validate_stock(product, new_qty):
             return False, "Not enough stock"
-        cart[key] = new_qty
-        request.session[cls.CART_KEY] = cart
-        request.session.modified = True
+        ReservationService.hold(holder, product.id, new_qty)
+        cls.set_line(request, product.id, new_qty)
+        return True, None
+
+    @classmethod
+    async def aadd_item(cls, request, product_id, quantity=1):
+        from .models import Product
+        holder = await cls.aget_holder(request, create=True)
+        product = await ReservationService.with_availability(Product.objects.filter(id=product_id), holder).afirst()
+        if not ProductService.validate_stock(product, quantity):
+            return False, "Invalid stock"
+        cart = await cls.aget_cart(request)
+        new_qty = cart.get(str(product_id), 0) + quantity
+        if not ProductService.validate_stock(product, new_qty):
+            return False, "Not enough stock"
+        await ReservationService.ahold(holder, product.id, new_qty)
+        await cls.aset_line(request, product.id, new_qty)
         return True, None
 
     @classmethod
     def remove_item(cls, request, product_id):
-        """Remove item from cart."""
-        cart = cls.get_cart(request)
-        cart.pop(str(product_id), None)
-        request.session[cls.CART_KEY] = cart
-        request.session.modified = True
+        """Remove item from cart and release its hold."""
+        cls.delete_lines(request, [product_id])
+        holder = cls.get_holder(request)
+        if holder:
+            ReservationService.release(holder, [product_id])
+
+    @classmethod
+    async def aremove_item(cls, request, product_id):
+        await cls.adelete_lines(request, [product_id])
+        holder = await cls.aget_holder(request)
+        if holder:
+            await ReservationService.arelease(holder, [product_id])
 
     @classmethod
     def update_quantity(cls, request, product_id, quantity):
-        """Update item quantity with stock validation."""
+        """Update item quantity with stock validation and refresh the hold."""
         from .models import Product
-        product = Product.objects.filter(id=product_id).first()
+        holder = cls.get_holder(request, create=True)
+        product = ReservationService.with_availability(Product.objects.filter(id=product_id), holder).first()
         if not ProductService.validate_stock(product, quantity):
             return False, "Invalid stock"
-        cart = cls.get_cart(request)
-        cart[str(product_id)] = quantity
-        request.session[cls.CART_KEY] = cart
-        request.session.modified = True
+        ReservationService.hold(holder, product.id, quantity)
+        cls.set_line(request, product.id, quantity)
+        return True, None
+
+    @classmethod
+    async def aupdate_quantity(cls, request, product_id, quantity):
+        from .models import Product
+        holder = await cls.aget_holder(request, create=True)
+        product = await ReservationService.with_availability(Product.objects.filter(id=product_id), holder).afirst()
+        if not ProductService.validate_stock(product, quantity):
+            return False, "Invalid stock"
+        await ReservationService.ahold(holder, product.id, quantity)
+        await cls.aset_line(request, product.id, quantity)
         return True, None
 
     @classmethod
     def get_cart_items(cls, request):
-        """Get cart with product details and totals."""
+        """Get cart with product details and totals, hydrated once per request."""
+        summary = cls.get_summary(request)
+        return summary.items, summary.total
+
+    @classmethod
+    def load_cart_items(cls, cart, dropped=None):
+        """Hydrate a cart dict into item dicts and a total.
+
+        All cart products are loaded with a single ``id__in`` query, so the
+        cost is at most ``CART_ITEMS_MAX_QUERIES`` whatever the cart size.
+        Product ids of skipped lines are appended to ``dropped`` if given.
+        """
         from .models import Product
-        cart = cls.get_cart(request)
+        if not cart:
+            return [], Decimal("0")
+        ids = cls._product_ids(cart)
+        products = Product.objects.select_related("seller", "category").in_bulk(ids)
+        return cls._price_lines(((pid, products.get(pid), cart[str(pid)]) for pid in ids), dropped)
+
+    @classmethod
+    async def aload_cart_items(cls, cart, dropped=None):
+        from .models import Product
+        if not cart:
+            return [], Decimal("0")
+        ids = cls._product_ids(cart)
+        products = await Product.objects.select_related("seller", "category").ain_bulk(ids)
+        return cls._price_lines(((pid, products.get(pid), cart[str(pid)]) for pid in ids), dropped)
+
+    @staticmethod
+    def _product_ids(cart):
+        return [int(pid) for pid in cart if str(pid).isdigit()]
+
+    @staticmethod
+    def _price_lines(lines, dropped=None):
+        """Item dicts and total for (product id, product, quantity) lines, skipping unavailable lines."""
         items = []
         total = Decimal("0")
-        for pid, qty in cart.items():
-            product = Product.objects.filter(id=pid).select_related("seller", "category").first()
+        for product_id, product, qty in lines:
             if product and ProductService.validate_stock(product, qty):
                 subtotal = product.price * qty
                 items.append({"product": product, "quantity": qty, "subtotal": subtotal})
                 total += subtotal
+            elif dropped is not None:
+                dropped.append(product_id)
         return items, total
 
+    @classmethod
+    def load_user_cart_items(cls, user, lock=False, dropped=None):
+        """Hydrate a user's database cart with one query joining lines to products.
+
+        With ``lock`` the lines and their products are selected FOR UPDATE
+        (a no-op on SQLite, where the write transaction serializes instead).
+        """
+        from .models import CartItem
+        lines = (
+            CartItem.objects.filter(cart_id=user.pk)
+            .select_related("product__seller", "product__category")
+            .order_by("id")
+        )
+        if lock:
+            lines = lines.select_for_update(of=("self", "product"))
+        return cls._price_lines(((line.product_id, line.product, line.quantity) for line in lines), dropped)
+
+    @classmethod
+    async def aload_user_cart_items(cls, user, dropped=None):
+        from .models import CartItem
+        lines = (
+            CartItem.objects.filter(cart_id=user.pk)
+            .select_related("product__seller", "product__category")
+            .order_by("id")
+        )
+        return cls._price_lines([(line.product_id, line.product, line.quantity) async for line in lines], dropped)
+
+    @classmethod
+    def prune_lines(cls, request, product_ids):
+        """Remove lines the cart page no longer shows and release their holds.
+
+        Costs nothing while every line is still available; CartSummary calls
+        it with the lines it skipped while hydrating.
+        """
+        cls.delete_lines(request, product_ids)
+        holder = cls.get_holder(request)
+        if holder:
+            ReservationService.release(holder, product_ids)
+
+    @classmethod
+    async def aprune_lines(cls, request, product_ids):
+        await cls.adelete_lines(request, product_ids)
+        holder = await cls.aget_holder(request)
+        if holder:
+            await ReservationService.arelease(holder, product_ids)
+
     @classmethod
     def clear_cart(cls, request):
-        """Clear cart after checkout."""
-        request.session[cls.CART_KEY] = {}
-        request.session.modified = True
+        """Clear cart after checkout; place_order has already released its holds."""
+        cls.delete_lines(request)
+
+
+class OutOfStock(Exception):
+    """Checkout lines whose stock ran out, or whose product was deleted, before the order was placed."""
+
+    def __init__(self, lines, missing=()):
+        self.lines = lines
+        self.missing = list(missing)
+        problems = []
+        if lines:
+            names = ", ".join(f'{line["product"].name} (requested {line["quantity"]})' for line in lines)
+            problems.append(f"Not enough stock for: {names}")
+        if self.missing:
+            problems.append(f'No longer available: {", ".join(line["product"].name for line in self.missing)}')
+        super().__init__("; ".join(problems))
 
 
 class OrderService:
     """Checkout validation, order processing, stock reduction, payment creation."""
 
+    # Cart lines handled per statement: one stock UPDATE, one bulk INSERT of
+    # order items and one seller stats INSERT and UPDATE per batch, so no
+    # statement grows with the cart (nor hits SQLite's 999-parameter bulk
+    # batches or expression depth limit).
+    CHECKOUT_BATCH_LINES = 100
+    # Statements issued by place_order for a cart of up to
+    # CHECKOUT_BATCH_LINES lines: the stock UPDATE, INSERTs for the order,
+    # its items and the payment, the seller stats INSERT (conflicts ignored)
+    # and UPDATE, and one DELETE releasing the cart's holds. See
+    # checkout_max_queries() for longer carts.
+    CHECKOUT_MAX_QUERIES = 7
+
+    @classmethod
+    def checkout_max_queries(cls, lines):
+        """Statements place_order issues at most for a cart of ``lines`` lines."""
+        extra_batches = max(0, -(-lines // cls.CHECKOUT_BATCH_LINES) - 1)
+        return cls.CHECKOUT_MAX_QUERIES + 4 * extra_batches
+
     @staticmethod
     def process_checkout(request, form):
-        """Validate cart, create order, reduce stock, create payment."""
-        from .models import Order, OrderItem, Payment
-        cart_items, total = CartService.get_cart_items(request)
-        if not cart_items:
-            return None, "Cart is empty"
-        if not form.is_valid():
-            return None, "Invalid form"
-        data = form.cleaned_data
-        order = Order.objects.create(
-            user=request.user,
-            first_name=data["first_name"],
-            last_name=data["last_name"],
-            phone=data["phone"],
-            wilaya=data["wilaya"],
-            address=data["address"],
-            payment_method=data["payment_method"],
-            total_price=total,
+        """Validate cart and form, place the order, clear the cart.
+
+        A database cart is re-read inside the transaction, its lines joined
+        to their products and locked, so a change made from another device
+        cannot slip in between pricing the order and clearing the cart.
+        """
+        with transaction.atomic():
+            if CartService.uses_db(request):
+                cart_items, total = CartService.load_user_cart_items(request.user, lock=True)
+            else:
+                cart_items, total = CartService.get_cart_items(request)
+            if not cart_items:
+                return None, "Cart is empty"
+            if not form.is_valid():
+                return None, "Invalid form"
+            try:
+                order = OrderService.place_order(
+                    request.user, form.cleaned_data, cart_items, holder=CartService.get_holder(request)
+                )
+            except OutOfStock as exc:
+                return None, str(exc)
+            CartService.clear_cart(request)
+        return order, None
+
+    @staticmethod
+    def get_seller_order_page(seller, cursor=None, page_size=None):
+        """One keyset page of orders containing the seller's items, newest first.
+
+        The seller's units and total per order are aggregated in SQL and only
+        the seller's lines are prefetched (as ``seller_items``), so every page
+        costs two queries however deep it is. Raises InvalidCursor for a
+        malformed cursor.
+        """
+        from .models import Order, OrderItem
+        from .pagination import KeysetPaginator, clamp_page_size
+        lines = (
+            OrderItem.objects.filter(seller=seller)
+            .select_related("product")
+            .only("order", "product", "quantity", "price", "product__name", "product__slug")
+            .annotate(line_total=F("quantity") * F("price"))
+            .order_by("id")
         )
-        for item in cart_items:
-            product = item["product"]
-            qty = item["quantity"]
-            price = product.price
-            OrderItem.objects.create(
+        orders = (
+            Order.objects.filter(items__seller=seller)
+            .only("created_at", "first_name", "last_name", "wilaya", "payment_method")
+            .annotate(
+                seller_units=Sum("items__quantity"),
+                seller_total=Sum(F("items__quantity") * F("items__price")),
+            )
+            .prefetch_related(Prefetch("items", queryset=lines, to_attr="seller_items"))
+        )
+        paginator = KeysetPaginator(orders, ["-created_at", "-id"], clamp_page_size(page_size))
+        return paginator.get_page(cursor)
+
+    @staticmethod
+    def place_order(user, data, cart_items, holder=None):
+        """Reserve stock and create order, items and payment in one transaction.
+
+        Stock is taken by one conditional UPDATE per CHECKOUT_BATCH_LINES
+        lines (``stock - held by other carts >= qty`` per row, the quantity
+        picked by a CASE on the id), so concurrent checkouts can never drive
+        it negative and never eat into another cart's hold. The holder's own
+        reservations are released. If any line cannot be fulfilled, nothing
+        is written and OutOfStock lists every short line and every line
+        whose product no longer exists.
+        Issues at most checkout_max_queries(len(cart_items)) statements.
+        """
+        from .models import Order, OrderItem, Payment, Product
+        from .cache import CatalogCache
+        batch_size = OrderService.CHECKOUT_BATCH_LINES
+        total = sum((item["product"].price * item["quantity"] for item in cart_items), Decimal("0"))
+        with transaction.atomic():
+            now = timezone.now()
+            taken = 0
+            for start in range(0, len(cart_items), batch_size):
+                batch = cart_items[start:start + batch_size]
+                needed = Case(
+                    *[When(id=item["product"].id, then=Value(item["quantity"])) for item in batch],
+                    output_field=PositiveIntegerField(),
+                )
+                taken += (
+                    Product.objects.alias(held=ReservationService.held_elsewhere(holder, now), needed=needed)
+                    .filter(id__in=[item["product"].id for item in batch], stock__gte=F("held") + F("needed"))
+                    .update(stock=F("stock") - needed, updated_at=now)
+                )
+            if taken != len(cart_items):
+                # Rows that were not decremented kept their old updated_at;
+                # deleted products have no row at all. The transaction rolls
+                # back the batches that were taken.
+                current = dict(
+                    Product.objects.filter(id__in=[item["product"].id for item in cart_items])
+                    .values_list("id", "updated_at")
+                )
+                raise OutOfStock(
+                    [item for item in cart_items if current.get(item["product"].id, now) != now],
+                    [item for item in cart_items if item["product"].id not in current],
+                )
+            order = Order.objects.create(
+                user=user,
+                first_name=data["first_name"],
+                last_name=data["last_name"],
+                phone=data["phone"],
+                wilaya=data["wilaya"],
+                address=data["address"],
+                payment_method=data["payment_method"],
+                total_price=total,
+            )
+            items = OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    product=item["product"],
+                    seller_id=item["product"].seller_id,
+                    quantity=item["quantity"],
+                    price=item["product"].price,
+                )
+                for item in cart_items
+            ], batch_size=batch_size)
+            SellerAnalyticsService.record_sales(items, timezone.localdate(order.created_at), batch_size)
+            Payment.objects.create(
+                user=user,
                 order=order,
-                product=product,
-                seller=product.seller,
-                quantity=qty,
-                price=price,
+                first_name=data["first_name"],
+                last_name=data["last_name"],
+                phone=data["phone"],
+                wilaya=data["wilaya"],
+                address=data["address"],
+                amount=total,
+                payment_method=data["payment_method"],
             )
-            product.stock -= qty
-            product.save()
-        Payment.objects.create(
-            user=request.user,
-            order=order,
-            first_name=data["first_name"],
-            last_name=data["last_name"],
-            phone=data["phone"],
-            wilaya=data["wilaya"],
-            address=data["address"],
-            amount=total,
-            payment_method=data["payment_method"],
+            if holder:
+                ReservationService.release(holder)
+            # Stock changed through update(), which sends no model signals.
+            transaction.on_commit(CatalogCache.bump_version)
+        return order
+
+
+class SellerAnalyticsService:
+    """Seller sales figures served from the SellerDailyStats summary table.
+
+    Reads touch at most (days x seller's products) summary rows, however
+    many order lines the seller has.
+    """
+
+    # Default window, in days, for the dashboard figures.
+    DEFAULT_DAYS = 30
+    TOP_PRODUCTS = 5
+
+    @staticmethod
+    def record_sales(order_items, day, batch_size=100):
+        """Add one order's lines to the day's stats with two statements per batch_size rows, on any backend.
+
+        Missing rows are inserted as zeros (conflicts ignored), then one
+        UPDATE adds to the counters with F() expressions, so the database
+        does the arithmetic and concurrent checkouts never lose an increment.
+        """
+        from .models import SellerDailyStats
+        rows = {}
+        for item in order_items:
+            key = (item.seller_id, item.product_id)
+            units, revenue = rows.get(key, (0, Decimal("0")))
+            rows[key] = (units + item.quantity, revenue + item.quantity * item.price)
+        keys = list(rows)
+
+        def per_line(batch, value, output_field):
+            # Rows of the same sellers and products outside the batch add nothing.
+            return Case(
+                *[When(seller_id=s, product_id=p, then=Value(value(rows[s, p]))) for s, p in batch],
+                default=Value(0),
+                output_field=output_field,
+            )
+
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start:start + batch_size]
+            SellerDailyStats.objects.bulk_create(
+                [SellerDailyStats(seller_id=s, product_id=p, day=day) for s, p in batch], ignore_conflicts=True
+            )
+            SellerDailyStats.objects.filter(
+                seller_id__in={s for s, _ in batch}, product_id__in={p for _, p in batch}, day=day
+            ).update(
+                orders=F("orders") + per_line(batch, lambda totals: 1, PositiveIntegerField()),
+                units=F("units") + per_line(batch, lambda totals: totals[0], PositiveIntegerField()),
+                revenue=F("revenue") + per_line(
+                    batch, lambda totals: totals[1], DecimalField(max_digits=14, decimal_places=2)
+                ),
+            )
+
+    @staticmethod
+    def rebuild(seller=None, batch_size=1000):
+        """Recompute the summary table (or one seller's rows) from order items."""
+        from .models import OrderItem, SellerDailyStats
+        items = OrderItem.objects.all()
+        stats = SellerDailyStats.objects.all()
+        if seller is not None:
+            items = items.filter(seller=seller)
+            stats = stats.filter(seller=seller)
+        rows = (
+            items.annotate(day=TruncDate("order__created_at"))
+            .values("seller_id", "product_id", "day")
+            .annotate(
+                n_orders=Count("order_id", distinct=True),
+                n_units=Sum("quantity"),
+                total=Sum(F("quantity") * F("price"), output_field=DecimalField(max_digits=14, decimal_places=2)),
+            )
+            .order_by()
         )
-        CartService.clear_cart(request)
-        return order, None
+        created = 0
+        with transaction.atomic():
+            stats.delete()
+            batch = []
+            for row in rows.iterator(chunk_size=batch_size):
+                batch.append(SellerDailyStats(
+                    seller_id=row["seller_id"], product_id=row["product_id"], day=row["day"],
+                    orders=row["n_orders"], units=row["n_units"], revenue=row["total"],
+                ))
+                if len(batch) >= batch_size:
+                    created += len(SellerDailyStats.objects.bulk_create(batch))
+                    batch = []
+            created += len(SellerDailyStats.objects.bulk_create(batch))
+        return created
+
+    @classmethod
+    def _window(cls, seller, days):
+        from .models import SellerDailyStats
+        since = timezone.localdate() - timedelta(days=days - 1)
+        return SellerDailyStats.objects.filter(seller=seller, day__gte=since), since
+
+    @classmethod
+    def revenue_by_day(cls, seller, days=DEFAULT_DAYS):
+        """[{"day", "units", "revenue"}] for each of the last days, oldest first (gaps filled)."""
+        qs, since = cls._window(seller, days)
+        totals = {
+            row["day"]: row
+            for row in qs.values("day").annotate(total_units=Sum("units"), total_revenue=Sum("revenue")).order_by()
+        }
+        result = []
+        for offset in range(days):
+            day = since + timedelta(days=offset)
+            row = totals.get(day, {})
+            result.append({
+                "day": day,
+                "units": row.get("total_units", 0),
+                "revenue": row.get("total_revenue", Decimal("0")),
+            })
+        return result
+
+    @classmethod
+    def units_by_product(cls, seller, days=DEFAULT_DAYS):
+        """Per-product units and revenue over the last days, best sellers (by units) first."""
+        qs, _ = cls._window(seller, days)
+        return (
+            qs.values("product_id", "product__name", "product__slug")
+            .annotate(total_units=Sum("units"), total_revenue=Sum("revenue"))
+            .order_by("-total_units", "product_id")
+        )
+
+    @classmethod
+    def top_products(cls, seller, days=DEFAULT_DAYS, limit=TOP_PRODUCTS):
+        """Highest-revenue products over the last days."""
+        return list(cls.units_by_product(seller, days).order_by("-total_revenue", "product_id")[:limit])
+
+    @classmethod
+    def dashboard(cls, seller, days=DEFAULT_DAYS):
+        """Figures for the seller dashboard: per-day series, totals and top products."""
+        by_day = cls.revenue_by_day(seller, days)
+        return {
+            "days": days,
+            "by_day": by_day,
+            "units": sum(row["units"] for row in by_day),
+            "revenue": sum((row["revenue"] for row in by_day), Decimal("0")),
+            "top_products": cls.top_products(seller, days),
+        }
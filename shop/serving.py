@@ -0,0 +1,101 @@
+"""Media and static file serving with cache headers suited to hashed names."""
+import mimetypes
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import serve, was_modified_since
+
+from .storage import is_hashed_name
+
+# A hashed name always means the same bytes, so browsers may keep it forever.
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+# Other media (legacy names) may be replaced in place.
+MUTABLE_MAX_AGE = 60 * 60
+# Unhashed static names change on every deploy.
+STATIC_MAX_AGE = 5 * 60
+
+# ManifestStaticFilesStorage name: <name>.<12 hex>.<ext>
+STATIC_HASHED_NAME = re.compile(r"\.[0-9a-f]{12}\.[^./]+$")
+_QUALITY = re.compile(r"q\s*=\s*([^\s;]*)")
+# Precompressed siblings looked for, in preference order.
+STATIC_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def serve_media(request, path):
+    """Serve a file from MEDIA_ROOT; content-addressed files are cached as immutable."""
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if response.status_code == 200:
+        if is_hashed_name(path):
+            patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+        else:
+            patch_cache_control(response, public=True, max_age=MUTABLE_MAX_AGE)
+    return response
+
+
+def accepted_encodings(header):
+    """Content codings an Accept-Encoding header allows (q > 0), lower-cased.
+
+    A coding with a malformed q-value counts as not accepted.
+    """
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        match = _QUALITY.search(params)
+        try:
+            quality = float(match.group(1)) if match else 1.0
+        except ValueError:
+            continue
+        if quality > 0:
+            accepted.add(coding)
+    return accepted
+
+
+def _static_cache_headers(response, path):
+    patch_vary_headers(response, ["Accept-Encoding"])
+    if STATIC_HASHED_NAME.search(path):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=STATIC_MAX_AGE)
+    return response
+
+
+def serve_static(request, path):
+    """Serve a collected file from STATIC_ROOT, precompressed when the client accepts it.
+
+    Uses the .br/.gz sibling written by collectstatic for the best coding
+    in Accept-Encoding. Manifest-hashed names are cached as immutable.
+    """
+    if not settings.STATIC_ROOT:
+        raise Http404("STATIC_ROOT is not set")
+    try:
+        fullpath = Path(safe_join(settings.STATIC_ROOT, path))
+    except SuspiciousFileOperation:
+        raise Http404("Invalid path")
+    if not fullpath.is_file():
+        raise Http404(f"{path} not found")
+    accepted = accepted_encodings(request.headers.get("Accept-Encoding", ""))
+    chosen, encoding = fullpath, None
+    for coding, suffix in STATIC_ENCODINGS:
+        candidate = fullpath.with_name(fullpath.name + suffix)
+        if (coding in accepted or "*" in accepted) and candidate.is_file():
+            chosen, encoding = candidate, coding
+            break
+    stat = chosen.stat()
+    if not was_modified_since(request.headers.get("If-Modified-Since"), stat.st_mtime):
+        return _static_cache_headers(HttpResponseNotModified(), path)
+    content_type, _ = mimetypes.guess_type(fullpath.name)
+    response = FileResponse(chosen.open("rb"), content_type=content_type or "application/octet-stream")
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    response["Content-Length"] = stat.st_size
+    if encoding:
+        response["Content-Encoding"] = encoding
+    return _static_cache_headers(response, path)
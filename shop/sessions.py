@@ -0,0 +1,60 @@
+"""Cached file session engine - SESSION_ENGINE = "shop.sessions".
+
+Sessions are written to files (atomic rename, one file per session) and
+read through the SESSION_CACHE_ALIAS cache. Unlike the db and cached_db
+engines, a cart write never takes SQLite's single write lock, and unlike
+the pure cache engine, sessions survive a cache flush or restart.
+"""
+from django.conf import settings
+from django.contrib.sessions.backends.file import SessionStore as FileStore
+from django.core.cache import caches
+
+KEY_PREFIX = "shop.sessions"
+
+
+class SessionStore(FileStore):
+    """File-backed sessions with a write-through cache in front."""
+
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        self._cache = caches[settings.SESSION_CACHE_ALIAS]
+        super().__init__(session_key)
+
+    @property
+    def cache_key(self):
+        return self.cache_key_prefix + self._get_or_create_session_key()
+
+    def load(self):
+        try:
+            data = self._cache.get(self.cache_key)
+        except Exception:
+            # Invalid keys raise on some backends; fall back to the file.
+            data = None
+        if data is None:
+            data = super().load()
+            if data and self.session_key:
+                self._cache.set(self.cache_key, data, self.get_expiry_age(expiry=self._expiry_date(data)))
+        return data
+
+    def exists(self, session_key):
+        return bool(session_key) and (self.cache_key_prefix + session_key) in self._cache or super().exists(session_key)
+
+    def save(self, must_create=False):
+        super().save(must_create)
+        if self.session_key:
+            self._cache.set(self.cache_key, self._session, self.get_expiry_age())
+
+    def delete(self, session_key=None):
+        super().delete(session_key)
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        self._cache.delete(self.cache_key_prefix + session_key)
+
+    def flush(self):
+        """Remove the current session data and regenerate the key."""
+        self.clear()
+        self.delete(self.session_key)
+        self._session_key = None
@@ -0,0 +1,80 @@
+"""Signal handlers - keep catalog caches, the search index and media in step with the database; merge carts on login."""
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .cache import CatalogCache
+from .images import product_files
+from .models import Category, Product, ProductFile
+from .search import get_search_backend
+from .services import CartService
+from .storage import link_files, release_files
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog_cache(sender, **kwargs):
+    """Bump the catalog version once the change is committed."""
+    transaction.on_commit(CatalogCache.bump_version)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_catalog_on_rename(sender, created=False, update_fields=None, raw=False, **kwargs):
+    """Seller names are shown on product pages; logins (last_login only) are skipped."""
+    if not (created or raw) and (update_fields is None or "username" in update_fields):
+        transaction.on_commit(CatalogCache.bump_version)
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_files(sender, instance, raw=False, **kwargs):
+    """Note the media an existing product points at before it is saved."""
+    if raw or instance.pk is None:
+        return
+    previous = Product.objects.filter(pk=instance.pk).values_list("image", "image_variants").first()
+    instance._previous_files = product_files(*previous) if previous else set()
+
+
+@receiver(post_save, sender=Product)
+def release_replaced_files(sender, instance, created=False, raw=False, **kwargs):
+    """Record the product's media and garbage-collect what it no longer uses, after commit."""
+    current = product_files(instance.image.name, instance.image_variants)
+    previous = getattr(instance, "_previous_files", set())
+    instance._previous_files = set()
+    if created or raw or current != previous:
+        link_files(instance.pk, current)
+    dropped = previous - current
+    if dropped:
+        transaction.on_commit(lambda: release_files(dropped))
+
+
+@receiver(pre_delete, sender=Product)
+def release_deleted_files(sender, instance, **kwargs):
+    """Garbage-collect a deleted product's media, after commit.
+
+    The names come from ProductFile, not the instance, whose
+    image_variants may predate the worker that generated them.
+    """
+    files = product_files(instance.image.name, instance.image_variants)
+    files |= set(ProductFile.objects.filter(product_id=instance.pk).values_list("name", flat=True))
+    if files:
+        transaction.on_commit(lambda: release_files(files))
+
+
+@receiver(post_migrate)
+def ensure_search_index(sender, using="default", **kwargs):
+    """Recreate search triggers that a table rebuild may have dropped."""
+    if sender.name != "shop":
+        return
+    if Product._meta.db_table in connections[using].introspection.table_names():
+        get_search_backend(using).install()
+
+
+@receiver(user_logged_in)
+def merge_session_cart(sender, request, user, **kwargs):
+    """Fold the anonymous session cart into the user's database cart."""
+    if request is not None and hasattr(request, "session"):
+        CartService.merge_session_cart(request, user)
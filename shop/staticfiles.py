@@ -0,0 +1,144 @@
+"""collectstatic storage: minify, manifest-hash, then precompress CSS/JS.
+
+Minification uses rcssmin/rjsmin when installed and otherwise a
+conservative built-in pass (comments and redundant whitespace only).
+Next to every collected text asset it writes a ``.gz`` sibling, and a
+``.br`` sibling when the ``brotli`` package is installed, for
+shop.serving.serve_static to pick by Accept-Encoding.
+"""
+import gzip
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+# Encodings written at collectstatic time, in server preference order.
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz")) if brotli else (("gzip", ".gz"),)
+
+_CSS_TOKENS = re.compile(r"""(/\*!.*?\*/)|(/\*.*?\*/)|("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')""", re.S)
+_CSS_SPACE = re.compile(r"\s+")
+_CSS_PUNCT = re.compile(r"\s*([{};,>])\s*")
+
+
+def _minify_css_code(code):
+    code = _CSS_SPACE.sub(" ", code)
+    return _CSS_PUNCT.sub(r"\1", code).replace(";}", "}")
+
+
+def minify_css(source):
+    """Strip comments (except /*! */) and whitespace that CSS does not need."""
+    if rcssmin:
+        return rcssmin.cssmin(source)
+    out, code, pos = [], [], 0
+    for match in _CSS_TOKENS.finditer(source):
+        code.append(source[pos:match.start()])
+        pos = match.end()
+        licence, _comment, string = match.groups()
+        if licence or string:
+            # Comments are dropped first, so whitespace around them collapses too.
+            out.append(_minify_css_code(" ".join(code)))
+            out.append(licence or string)
+            code = []
+    code.append(source[pos:])
+    out.append(_minify_css_code(" ".join(code)))
+    return "".join(out).strip()
+
+
+def minify_js(source):
+    """Drop comment-only lines, indentation and blank lines; code is not rewritten.
+
+    Template literals may span lines, and any line of one - blank, indented
+    or starting with ``//`` - is part of a string, so without rjsmin files
+    containing backticks are passed through unchanged.
+    """
+    if rjsmin:
+        return rjsmin.jsmin(source)
+    if "`" in source:
+        return source
+    lines, in_comment = [], False
+    for line in source.splitlines():
+        stripped = line.strip()
+        if in_comment:
+            in_comment = "*/" not in stripped
+            continue
+        if not stripped or stripped.startswith("//"):
+            continue
+        if stripped.startswith("/*") and not stripped.startswith("/*!"):
+            in_comment = "*/" not in stripped[2:]
+            if in_comment or stripped.endswith("*/"):
+                continue
+        lines.append(stripped)
+    return "\n".join(lines) + "\n"
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that minifies CSS/JS and writes compressed siblings.
+
+    Until collectstatic has written the manifest, {% static %} links the
+    unhashed names instead of failing on every page.
+    """
+
+    minifiers = {".css": minify_css, ".js": minify_js}
+    compress_extensions = (".css", ".js", ".svg", ".json", ".txt", ".map", ".xml", ".html")
+    # Below this size compression overhead outweighs the saving.
+    compress_min_size = 256
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Read once, like the manifest itself: restart after collectstatic.
+        self.collected = self.manifest_storage.exists(self.manifest_name)
+
+    def stored_name(self, name):
+        if not self.collected:
+            return name
+        return super().stored_name(name)
+
+    def _save(self, name, content):
+        # Runs for the initial copy, before hashing, so hashes cover minified bytes.
+        minifier = next((fn for ext, fn in self.minifiers.items() if name.endswith(ext)), None)
+        if minifier and not name.endswith((".min.css", ".min.js")):
+            content.seek(0)
+            text = content.read()
+            text = text.decode("utf-8") if isinstance(text, bytes) else text
+            content = ContentFile(minifier(text).encode("utf-8"))
+        return super()._save(name, content)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for original, hashed in self.hashed_files.items():
+            for name in {original, hashed}:
+                if name.endswith(self.compress_extensions):
+                    self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as fh:
+            data = fh.read()
+        if len(data) < self.compress_min_size:
+            return
+        for encoding, suffix in PRECOMPRESSED:
+            if encoding == "br":
+                compressed = brotli.compress(data, quality=11)
+            else:
+                compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(compressed) >= len(data):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            super()._save(name + suffix, ContentFile(compressed))
@@ -0,0 +1,102 @@
+"""Content-addressed media storage - each distinct upload is stored once.
+
+Files are named after the SHA-256 of their content, so identical uploads
+share one blob and a URL never changes meaning. ProductFile rows record
+which products point at which blob (image or image variants), written in
+the same transaction as the product; release_files() deletes blobs no row
+names any more.
+"""
+import hashlib
+import posixpath
+import re
+
+from django.core.files import File
+from django.db import transaction
+from django.core.files.storage import FileSystemStorage, storages
+
+# Name of a content-addressed blob: <dir>/<2 hex>/<64 hex>.<ext>
+HASHED_NAME = re.compile(r"(?:^|/)([0-9a-f]{2})/\1[0-9a-f]{62}\.[A-Za-z0-9]+$")
+
+
+def content_hash(content):
+    sha = hashlib.sha256()
+    if hasattr(content, "seek"):
+        content.seek(0)
+    for chunk in content.chunks():
+        sha.update(chunk)
+    if hasattr(content, "seek"):
+        content.seek(0)
+    return sha.hexdigest()
+
+
+def is_hashed_name(name):
+    return bool(HASHED_NAME.search(name))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by content hash and never stores a blob twice.
+
+    The directory of the requested name is kept (e.g. ``products/``) and
+    the file goes to ``<dir>/<hh>/<sha256>.<ext>``. Saving content that is
+    already stored writes nothing and returns the existing name.
+    """
+
+    def __init__(self, **kwargs):
+        # Same name means same bytes, so a concurrent writer may overwrite.
+        kwargs.setdefault("allow_overwrite", True)
+        super().__init__(**kwargs)
+
+    def hashed_name(self, name, content):
+        digest = content_hash(content)
+        directory = posixpath.dirname(name.replace("\\", "/"))
+        ext = posixpath.splitext(name)[1].lower()
+        return posixpath.join(directory, digest[:2], f"{digest}{ext}")
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+def product_image_storage():
+    """Storage for Product.image (the "product_images" alias in STORAGES)."""
+    return storages["product_images"]
+
+
+def link_files(product_id, names):
+    """Record names as exactly the files a product points at."""
+    from .models import ProductFile
+    ProductFile.objects.filter(product_id=product_id).exclude(name__in=names).delete()
+    ProductFile.objects.bulk_create(
+        [ProductFile(product_id=product_id, name=name) for name in names], ignore_conflicts=True
+    )
+
+
+def referenced_files(names):
+    """Subset of names still recorded for some product, in one query."""
+    from .models import ProductFile
+    return set(ProductFile.objects.filter(name__in=names).values_list("name", flat=True).distinct())
+
+
+def release_files(names, storage=None):
+    """Delete the blobs in names that no product references any more.
+
+    References are re-checked and blobs deleted inside a write
+    transaction. On SQLite (BEGIN IMMEDIATE) that excludes a concurrent
+    save that reuses one of these blobs but has not committed yet.
+    Returns the names deleted.
+    """
+    names = {name for name in names if name}
+    if not names:
+        return set()
+    storage = storage or product_image_storage()
+    with transaction.atomic():
+        unused = names - referenced_files(names)
+        for name in unused:
+            storage.delete(name)
+    return unused
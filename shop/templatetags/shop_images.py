@@ -0,0 +1,47 @@
+"""Template tags for responsive product images."""
+from django import template
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+
+def _srcset(storage, variants, fmt):
+    entries = sorted(variants.values(), key=lambda entry: entry["width"])
+    return ", ".join(f"{storage.url(entry[fmt])} {entry['width']}w" for entry in entries)
+
+
+@register.simple_tag
+def product_image(product, variant="card", sizes=None, **attrs):
+    """<picture> with WebP and JPEG srcsets for product's image variants.
+
+    ``variant`` (thumb, card, detail) picks the fallback src and intrinsic
+    size; ``sizes`` defaults to that variant's width. Extra keyword
+    arguments become <img> attributes (alt, class, style, loading...).
+    Renders the original image until variants have been generated, and
+    nothing when the product has no image.
+
+        {% product_image product "card" sizes="(max-width: 576px) 50vw, 240px" %}
+    """
+    if not product.image:
+        return ""
+    attrs.setdefault("alt", product.name)
+    attrs.setdefault("loading", "lazy")
+    attrs.setdefault("decoding", "async")
+    variants = product.image_variants or {}
+    if variant not in variants:
+        extra = format_html_join(" ", '{}="{}"', attrs.items())
+        return format_html('<img src="{}" {}>', product.image.url, extra)
+    storage = product.image.storage
+    chosen = variants[variant]
+    sizes = sizes or f"{chosen['width']}px"
+    attrs.update(width=chosen["width"], height=chosen["height"], sizes=sizes)
+    extra = format_html_join(" ", '{}="{}"', attrs.items())
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" {}></picture>',
+        _srcset(storage, variants, "webp"),
+        sizes,
+        storage.url(chosen["jpeg"]),
+        _srcset(storage, variants, "jpeg"),
+        extra,
+    )
@@ -1,3 +1,474 @@
-from django.test import TestCase
+"""Shop tests - cart and checkout query bounds and stock, conditional GETs, cursors, media references, minifiers."""
+import re
+import tempfile
+import threading
+from decimal import Decimal
+from importlib import import_module
+from io import BytesIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.test import (
+    AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from accounts.models import Role, User
+from . import async_views
+from .management.benchmarking import CHECKOUT_DATA
+from .models import Category, Order, Product, ProductFile, SellerDailyStats
+from .pagination import KeysetPaginator
+from .services import CartService, OrderService, OutOfStock, SellerAnalyticsService
+from .staticfiles import minify_css, minify_js
+from .storage import product_image_storage, referenced_files, release_files
+
+TRANSACTION_CONTROL = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE SAVEPOINT")
+
+
+def make_products(count, seller, category, stock=10, price="2.50"):
+    return Product.objects.bulk_create(
+        Product(
+            name=f"Product {i}", slug=f"product-{i}", description="Test product",
+            price=Decimal(price), stock=stock, category=category, seller=seller,
+        )
+        for i in range(count)
+    )
+
+
+class CartItemsQueryTests(TestCase):
+    """get_cart_items stays within CART_ITEMS_MAX_QUERIES whatever the cart size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("seller", password="pass-123", role=Role.SELLER)
+        cls.category = Category.objects.create(name="Sensors", slug="sensors")
+        cls.products = make_products(100, cls.seller, cls.category)
+
+    def make_request(self, cart):
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+        request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+        CartService.save_cart(request, cart)
+        return request
+
+    def test_query_count_does_not_grow_with_lines(self):
+        for lines in (1, 10, 100):
+            with self.subTest(lines=lines):
+                request = self.make_request({str(p.id): 2 for p in self.products[:lines]})
+                with self.assertNumQueries(CartService.CART_ITEMS_MAX_QUERIES):
+                    items, total = CartService.get_cart_items(request)
+                self.assertEqual(len(items), lines)
+                self.assertEqual(total, Decimal("5.00") * lines)
+
+    def test_deleted_product_is_skipped(self):
+        request = self.make_request({str(p.id): 1 for p in self.products[:3]})
+        deleted = self.products[1]
+        Product.objects.filter(pk=deleted.pk).delete()
+        with self.assertNumQueries(CartService.CART_ITEMS_MAX_QUERIES):
+            items, total = CartService.get_cart_items(request)
+        self.assertEqual([item["product"].id for item in items], [self.products[0].id, self.products[2].id])
+        self.assertEqual(total, Decimal("5.00"))
+
+    def test_count_reads_lines_without_hydrating(self):
+        request = self.make_request({str(p.id): 2 for p in self.products[:10]})
+        with self.assertNumQueries(0):
+            self.assertEqual(CartService.get_summary(request).count, 20)
+
+    def test_count_matches_cart_page(self):
+        available, deleted, sold_out = self.products[:3]
+        request = self.make_request({str(available.id): 2, str(deleted.id): 1, str(sold_out.id): 4})
+        Product.objects.filter(pk=deleted.pk).delete()
+        Product.objects.filter(pk=sold_out.pk).update(stock=0)
+        items, _ = CartService.get_cart_items(request)
+        # Hydrating pruned the lines the cart page leaves out.
+        self.assertEqual(CartService.get_cart(request), {str(available.id): 2})
+        setattr(request, CartService.SUMMARY_ATTR, None)
+        with self.assertNumQueries(0):
+            self.assertEqual(CartService.get_summary(request).count, sum(item["quantity"] for item in items))
+
+    def test_user_cart_count_is_one_query(self):
+        buyer = User.objects.create_user("buyer", password="pass-123")
+        request = RequestFactory().get("/")
+        request.user = buyer
+        for product in self.products[:5]:
+            CartService.set_line(request, product.id, 3)
+        Product.objects.filter(pk=self.products[0].pk).update(stock=0)
+        with self.assertNumQueries(1):
+            self.assertEqual(CartService.get_summary(request).count, 15)
+        CartService.get_cart_items(request)
+        setattr(request, CartService.SUMMARY_ATTR, None)
+        with self.assertNumQueries(1):
+            self.assertEqual(CartService.get_summary(request).count, 12)
+
+
+class ProductDetailNotModifiedTests(TestCase):
+    """A revalidated product page is answered with a 304 before the product or the cart is hydrated."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("seller", password="pass-123", role=Role.SELLER)
+        cls.buyer = User.objects.create_user("buyer", password="pass-123")
+        cls.category = Category.objects.create(name="Sensors", slug="sensors")
+        cls.products = make_products(3, cls.seller, cls.category)
+        cls.url = f"/product/{cls.products[0].slug}/"
+
+    def fill_cart(self):
+        for product in self.products:
+            self.client.post(f"/cart/add/{product.id}/", {"quantity": 2})
+        self.client.get("/cart/")  # Consume the flash messages, which are never answered with a 304.
+
+    def assert_revalidates(self, max_queries):
+        etag = self.client.get(self.url)["ETag"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        statements = [q["sql"] for q in queries]
+        self.assertLessEqual(len(statements), max_queries, "\n".join(statements))
+        self.assertFalse([sql for sql in statements if "JOIN" in sql], "products were hydrated")
+
+    def test_anonymous_cart(self):
+        self.fill_cart()
+        # The updated_at lookup; the cart count comes from the session.
+        self.assert_revalidates(1)
+
+    def test_user_cart(self):
+        self.client.force_login(self.buyer)
+        self.fill_cart()
+        # The user, the cart's line quantities and the updated_at lookup.
+        self.assert_revalidates(3)
+
+    def test_async_view(self):
+        cart = {str(product.id): 2 for product in self.products}
+
+        def make_request(headers=None):
+            request = AsyncRequestFactory().get(self.url, headers=headers)
+            request.META["CSRF_COOKIE"] = "x" * 32  # What CsrfViewMiddleware reads from the cookie.
+            request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+            request.session[CartService.CART_KEY] = CartService.encode_cart(cart)
+
+            async def auser():
+                return AnonymousUser()
+
+            request.auser = auser
+            return request
+
+        slug = self.products[0].slug
+        view = async_to_sync(async_views.product_detail_view)
+        etag = view(make_request(), slug)["ETag"]
+        with CaptureQueriesContext(connection) as queries:
+            response = view(make_request(headers={"If-None-Match": etag}), slug)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1, "\n".join(q["sql"] for q in queries))
+
+
+class ApiProductValidatorTests(TestCase):
+    """The API product ETag follows the related values serialized in the body."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("seller", password="pass-123", role=Role.SELLER)
+        cls.category = Category.objects.create(name="Sensors", slug="sensors")
+        cls.product = make_products(1, cls.seller, cls.category)[0]
+        cls.url = f"/api/products/{cls.product.slug}/"
+
+    def assert_changes_etag(self, change):
+        etag = self.client.get(self.url)["ETag"]
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_category_rename(self):
+        def rename():
+            self.category.slug = "sensor-modules"
+            self.category.save()
+
+        self.assertEqual(self.assert_changes_etag(rename)["category"], "sensor-modules")
+
+    def test_seller_rename(self):
+        def rename():
+            self.seller.username = "robo-parts"
+            self.seller.save()
+
+        self.assertEqual(self.assert_changes_etag(rename)["seller"], "robo-parts")
+
+
+class CursorPaginationTests(TestCase):
+    """Cursor pages of the home grid and the API: bad cursors are 400s, walks are complete."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user("seller", password="pass-123", role=Role.SELLER)
+        cls.sensors = Category.objects.create(name="Sensors", slug="sensors")
+        motors = Category.objects.create(name="Motors", slug="motors")
+        # Repeated names make id the tie-breaker; some products are out of stock.
+        Product.objects.bulk_create(
+            Product(
+                name=f"{kind} {i % 4}", slug=f"{kind.lower().replace(' ', '-')}-{i}", description="Test product",
+                price=Decimal("1.00"), stock=i % 5, category=category, seller=seller,
+            )
+            for i in range(14)
+            for kind, category in (("Distance sensor", cls.sensors), ("Sensor shield", motors), ("Servo", motors))
+        )
+
+    def expected_ids(self, q, cat):
+        products = Product.objects.filter(stock__gt=0)
+        if q:
+            products = products.filter(name__icontains=q)
+        if cat:
+            products = products.filter(category__slug=cat)
+        return set(products.values_list("id", flat=True))
+
+    def walk(self, url, params, ids_of):
+        ids, cursor, pages = [], "", 0
+        while True:
+            response = self.client.get(url, {**params, "page_size": 3, "cursor": cursor})
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            ids += ids_of(data)
+            pages += 1
+            cursor = data["next_cursor"]
+            if not cursor:
+                return ids, pages
+
+    def test_walks_have_no_duplicates_or_gaps(self):
+        api = ("/api/products/", lambda data: [row["id"] for row in data["products"]])
+        grid = ("/products/more/", lambda data: [
+            int(pid) for section in data["sections"] for pid in re.findall(r'/cart/add/(\d+)/', section["html"])
+        ])
+        for url, ids_of in (api, grid):
+            for q, cat in (("", "sensors"), ("sensor", ""), ("sensor", "motors"), ("", "")):
+                with self.subTest(url=url, q=q, cat=cat):
+                    ids, pages = self.walk(url, {"q": q, "category": cat}, ids_of)
+                    self.assertEqual(len(ids), len(set(ids)), "duplicates")
+                    self.assertEqual(set(ids), self.expected_ids(q, cat), "gaps")
+                    self.assertGreater(pages, 1)
+
+    def bad_cursors(self):
+        """A cursor that is not base64 JSON, and a well-formed one whose id is not an integer."""
+        paginator = KeysetPaginator(Product.objects.all(), ["category__name", "name", "id"], 3)
+        wrong_type = paginator.encode_cursor({"category__name": "Sensors", "name": "Distance sensor 0", "id": "x"})
+        return {"malformed": "!!not-a-cursor", "wrong_type": wrong_type}
+
+    def test_bad_cursor_on_home_grid(self):
+        for kind, cursor in self.bad_cursors().items():
+            with self.subTest(kind):
+                response = self.client.get("/", {"category": "sensors", "cursor": cursor})
+                self.assertEqual(response.status_code, 400)
+                response = self.client.get("/products/more/", {"category": "sensors", "cursor": cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"error": "Invalid cursor"})
+
+    def test_bad_cursor_on_api(self):
+        for kind, cursor in self.bad_cursors().items():
+            with self.subTest(kind):
+                response = self.client.get("/api/products/", {"category": "sensors", "cursor": cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"error": "Invalid cursor"})
+
+
+class PlaceOrderStockTests(TransactionTestCase):
+    """place_order never oversells, even when checkouts race for the last units."""
+
+    def setUp(self):
+        self.seller = User.objects.create_user("seller", password="pass-123", role=Role.SELLER)
+        self.buyer = User.objects.create_user("buyer", password="pass-123")
+        self.category = Category.objects.create(name="Sensors", slug="sensors")
+
+    def test_concurrent_checkouts_for_last_units(self):
+        product = make_products(1, self.seller, self.category, stock=2)[0]
+        buyers = 8
+        outcomes, lock = [], threading.Lock()
+        start = threading.Barrier(buyers)
+
+        def checkout():
+            # Each thread has its own connection and its own product instance.
+            line = {"product": Product.objects.get(pk=product.pk), "quantity": 2}
+            start.wait()
+            try:
+                OrderService.place_order(self.buyer, CHECKOUT_DATA, [line])
+                outcome = "sold"
+            except OutOfStock:
+                outcome = "out_of_stock"
+            finally:
+                connections.close_all()
+            with lock:
+                outcomes.append(outcome)
+
+        threads = [threading.Thread(target=checkout) for _ in range(buyers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 0)
+        self.assertEqual(outcomes.count("sold"), 1)
+        self.assertEqual(outcomes.count("out_of_stock"), buyers - 1)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_out_of_stock_names_short_lines(self):
+        plenty, short = make_products(2, self.seller, self.category, stock=5)
+        Product.objects.filter(pk=short.pk).update(stock=1)
+        lines = [{"product": plenty, "quantity": 2}, {"product": short, "quantity": 3}]
+        with self.assertRaises(OutOfStock) as caught:
+            OrderService.place_order(self.buyer, CHECKOUT_DATA, lines)
+        self.assertEqual([line["product"].pk for line in caught.exception.lines], [short.pk])
+        self.assertIn(short.name, str(caught.exception))
+        self.assertNotIn(plenty.name, str(caught.exception))
+        plenty.refresh_from_db()
+        self.assertEqual(plenty.stock, 5)
+        self.assertFalse(Order.objects.exists())
+
+    def test_out_of_stock_names_deleted_products(self):
+        kept, deleted = make_products(2, self.seller, self.category, stock=5)
+        Product.objects.filter(pk=deleted.pk).delete()
+        lines = [{"product": kept, "quantity": 1}, {"product": deleted, "quantity": 1}]
+        with self.assertRaises(OutOfStock) as caught:
+            OrderService.place_order(self.buyer, CHECKOUT_DATA, lines)
+        self.assertEqual(caught.exception.lines, [])
+        self.assertEqual([line["product"].pk for line in caught.exception.missing], [deleted.pk])
+        self.assertIn(f"No longer available: {deleted.name}", str(caught.exception))
+        kept.refresh_from_db()
+        self.assertEqual(kept.stock, 5)
+
+    def test_checkout_stays_within_query_budget(self):
+        products = make_products(3, self.seller, self.category, stock=5)
+        lines = [{"product": product, "quantity": 1} for product in products]
+        with CaptureQueriesContext(connection) as queries:
+            OrderService.place_order(self.buyer, CHECKOUT_DATA, lines, holder="session:test")
+        # The budget counts statements, not transaction control.
+        statements = [q["sql"] for q in queries if not q["sql"].startswith(TRANSACTION_CONTROL)]
+        self.assertLessEqual(len(statements), OrderService.CHECKOUT_MAX_QUERIES, "\n".join(statements))
+        self.assertEqual(sum(sql.startswith('DELETE FROM "shop_stockreservation"') for sql in statements), 1)
+
+    def test_large_cart_stays_within_query_budget(self):
+        lines = 1100
+        products = make_products(lines, self.seller, self.category, stock=5)
+        cart_items = [{"product": product, "quantity": 2} for product in products]
+        with CaptureQueriesContext(connection) as queries:
+            OrderService.place_order(self.buyer, CHECKOUT_DATA, cart_items, holder="session:test")
+        statements = [q["sql"] for q in queries if not q["sql"].startswith(TRANSACTION_CONTROL)]
+        self.assertLessEqual(len(statements), OrderService.checkout_max_queries(lines))
+        self.assertEqual(set(Product.objects.values_list("stock", flat=True)), {3})
+        self.assertEqual(SellerDailyStats.objects.filter(orders=1, units=2).count(), lines)
+
+    def test_short_line_in_a_later_batch_takes_nothing(self):
+        products = make_products(OrderService.CHECKOUT_BATCH_LINES + 1, self.seller, self.category, stock=5)
+        short = products[-1]
+        Product.objects.filter(pk=short.pk).update(stock=1)
+        cart_items = [{"product": product, "quantity": 2} for product in products]
+        with self.assertRaises(OutOfStock) as caught:
+            OrderService.place_order(self.buyer, CHECKOUT_DATA, cart_items)
+        self.assertEqual([line["product"].pk for line in caught.exception.lines], [short.pk])
+        self.assertEqual(Product.objects.filter(stock=5).count(), OrderService.CHECKOUT_BATCH_LINES)
+
+
+def png_upload(color="red"):
+    buffer = BytesIO()
+    Image.new("RGB", (4, 4), color).save(buffer, format="PNG")
+    return SimpleUploadedFile("photo.png", buffer.getvalue(), content_type="image/png")
+
+
+class ProductFileReferenceTests(TestCase):
+    """Shared content-addressed blobs are deleted only when no product references them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("seller", password="pass-123", role=Role.SELLER)
+        cls.category = Category.objects.create(name="Sensors", slug="sensors")
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.storage = product_image_storage()
+
+    def make_product(self, slug, image):
+        return Product.objects.create(
+            name=slug, slug=slug, description="Test product", price=Decimal("1.00"), stock=1,
+            category=self.category, seller=self.seller, image=image,
+        )
+
+    def test_shared_blob_kept_until_last_reference_goes(self):
+        first = self.make_product("first", png_upload())
+        second = self.make_product("second", png_upload())
+        name = first.image.name
+        self.assertEqual(second.image.name, name)
+        self.assertEqual(ProductFile.objects.filter(name=name).count(), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(self.storage.exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(self.storage.exists(name))
+
+    def test_replaced_image_is_released(self):
+        product = self.make_product("product", png_upload("red"))
+        old = product.image.name
+        product.image = png_upload("blue")
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertFalse(self.storage.exists(old))
+        self.assertEqual(list(ProductFile.objects.values_list("name", flat=True)), [product.image.name])
+
+    def test_release_rechecks_references(self):
+        product = self.make_product("product", png_upload())
+        self.assertEqual(release_files({product.image.name}), set())
+        self.assertTrue(self.storage.exists(product.image.name))
+
+    def test_references_are_one_query(self):
+        names = {f"products/ab/{i:064x}.png" for i in range(50)}
+        with self.assertNumQueries(1):
+            self.assertEqual(referenced_files(names), set())
+
+
+class SellerStatsTests(TransactionTestCase):
+    """Checkout keeps SellerDailyStats equal to a rebuild from order items."""
+
+    def test_checkouts_accumulate_like_a_rebuild(self):
+        seller = User.objects.create_user("seller", password="pass-123", role=Role.SELLER)
+        buyer = User.objects.create_user("buyer", password="pass-123")
+        category = Category.objects.create(name="Sensors", slug="sensors")
+        first, second = make_products(2, seller, category, stock=10)
+        OrderService.place_order(buyer, CHECKOUT_DATA, [{"product": first, "quantity": 2}])
+        OrderService.place_order(
+            buyer, CHECKOUT_DATA, [{"product": first, "quantity": 1}, {"product": second, "quantity": 3}]
+        )
+        fields = ("product_id", "day", "orders", "units", "revenue")
+        recorded = list(SellerDailyStats.objects.order_by("product_id").values_list(*fields))
+        self.assertEqual([row[2:] for row in recorded], [(2, 3, Decimal("7.50")), (1, 3, Decimal("7.50"))])
+        SellerAnalyticsService.rebuild()
+        self.assertEqual(list(SellerDailyStats.objects.order_by("product_id").values_list(*fields)), recorded)
+
+
+@mock.patch("shop.staticfiles.rcssmin", None)
+@mock.patch("shop.staticfiles.rjsmin", None)
+class MinifierFallbackTests(SimpleTestCase):
+    """The built-in minifiers (used without rcssmin/rjsmin) only drop comments and whitespace."""
+
+    def test_js_drops_comments_indentation_and_blank_lines(self):
+        source = "// header\nfunction f() {\n\n    /* note */\n    return 1; // one\n}\n/*! licence */\n"
+        self.assertEqual(minify_js(source), "function f() {\nreturn 1; // one\n}\n/*! licence */\n")
+
+    def test_js_multiline_block_comment(self):
+        self.assertEqual(minify_js("/*\n * doc\n */\nvar a = 1;\n"), "var a = 1;\n")
+
+    def test_js_with_template_literal_is_unchanged(self):
+        source = "var s = `a\n// not a comment\n\n  b`;\n"
+        self.assertEqual(minify_js(source), source)
+
+    def test_css_drops_comments_and_whitespace(self):
+        source = "/* reset */\nbody {\n  margin: 0;\n  color: red;\n}\n\na > b , c { x: y }\n"
+        self.assertEqual(minify_css(source), "body{margin: 0;color: red}a>b,c{x: y}")
+
+    def test_css_keeps_strings_and_licence_comments(self):
+        source = '/*! keep */\na::before {\n  content: "/* not a comment */  ;";\n}\n'
+        self.assertEqual(minify_css(source), '/*! keep */ a::before{content: "/* not a comment */  ;"}')
@@ -1,20 +1,29 @@
 """Shop URL routes."""
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, async_views, views
+
+# Catalog and cart pages: async views under ASGI when SHOP_ASYNC_VIEWS is on.
+catalog = async_views if getattr(settings, "SHOP_ASYNC_VIEWS", False) else views
 
 app_name = "shop"
 
 urlpatterns = [
-    path("", views.home_view, name="home"),
+    path("", catalog.home_view, name="home"),
+    path("products/more/", views.product_more_view, name="product_more"),
     path("product/add/", views.product_create_view, name="product_create"),
     path("product/<slug:slug>/edit/", views.product_edit_view, name="product_edit"),
-    path("product/<slug:slug>/", views.product_detail_view, name="product_detail"),
+    path("product/<slug:slug>/", catalog.product_detail_view, name="product_detail"),
     path("product/<slug:slug>/delete/", views.product_delete_view, name="product_delete"),
-    path("cart/", views.cart_view, name="cart"),
-    path("cart/add/<int:product_id>/", views.cart_add_view, name="cart_add"),
-    path("cart/remove/<int:product_id>/", views.cart_remove_view, name="cart_remove"),
-    path("cart/update/<int:product_id>/", views.cart_update_view, name="cart_update"),
+    path("cart/", catalog.cart_view, name="cart"),
+    path("cart/add/<int:product_id>/", catalog.cart_add_view, name="cart_add"),
+    path("cart/remove/<int:product_id>/", catalog.cart_remove_view, name="cart_remove"),
+    path("cart/update/<int:product_id>/", catalog.cart_update_view, name="cart_update"),
     path("checkout/", views.checkout_view, name="checkout"),
     path("order/<int:order_id>/success/", views.order_success_view, name="order_success"),
     path("seller/dashboard/", views.seller_dashboard_view, name="seller_dashboard"),
+    path("seller/orders/", views.seller_orders_view, name="seller_orders"),
+    path("api/categories/", api.categories_view, name="api_categories"),
+    path("api/products/", api.product_list_view, name="api_products"),
+    path("api/products/<slug:slug>/", api.product_detail_view, name="api_product"),
 ]
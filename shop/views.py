@@ -1,48 +1,149 @@
 """Shop views - Controller (MVC), uses services for business logic."""
+import hashlib
+from urllib.parse import urlencode
+
+from django.http import HttpResponseBadRequest, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
-from django.db.models import Q
 from django.contrib import messages
 
 from accounts.decorators import seller_required
-from .models import Product, Category, Order
+from .models import Product, Order
 from .forms import ProductForm, CheckoutForm
-from .services import ProductService, CartService, OrderService
+from .services import ProductService, CartService, OrderService, SellerAnalyticsService
+from .cache import CatalogCache
+from .pagination import InvalidCursor, clamp_page_size
+from .routers import read_from_primary
 
+# Latest orders shown on the seller dashboard; the rest are in the order history.
+SELLER_DASHBOARD_ORDERS = 10
 
-def home_view(request):
-    """Home page - products grouped by category."""
-    categories = Category.objects.all().order_by("name")
+
+def home_params(request):
+    """Grid parameters of a home page request; also the grid's cache key parts."""
     q = request.GET.get("q", "")
     cat = request.GET.get("category", "")
-    view_all = request.GET.get("view_all") == "1"
-    products_qs = Product.objects.filter(stock__gt=0).select_related("category", "seller").order_by("category__name", "name")
-    if q:
-        products_qs = products_qs.filter(Q(name__icontains=q) | Q(description__icontains=q))
-    if cat:
-        products_qs = products_qs.filter(category__slug=cat)
-    # Group products by category for main page
-    products_by_category = {}
-    for p in products_qs:
-        key = (p.category.id, p.category.name, p.category.slug)
-        if key not in products_by_category:
-            products_by_category[key] = []
-        products_by_category[key].append(p)
-    # Limit to 6 per category unless view_all or single category filter
-    limit = 6 if not (view_all or cat) else 999
-    for key in products_by_category:
-        products_by_category[key] = products_by_category[key][:limit]
-    context = {"products_by_category": products_by_category, "categories": categories, "q": q, "cat": cat}
+    paginated = request.GET.get("view_all") == "1" or bool(cat)
+    return {
+        "q": q,
+        "cat": cat,
+        "paginated": paginated,
+        "cursor": request.GET.get("cursor", "") if paginated else "",
+        "page_size": clamp_page_size(request.GET.get("page_size")) if paginated else None,
+    }
+
+
+def build_home_grid(q, cat, paginated, cursor, page_size):
+    """Template context of the home grid; raises InvalidCursor for a bad cursor."""
+    if not paginated:
+        return {"products_by_category": ProductService.get_products_by_category(q), "q": q}
+    page = ProductService.get_product_page(q, cat, cursor, page_size)
+    more_query = urlencode({k: v for k, v in (("q", q), ("category", cat), ("page_size", page_size)) if v})
+    return {
+        "products_by_category": ProductService.group_by_category(page),
+        "q": q,
+        "next_cursor": page.next_cursor,
+        "more_query": more_query,
+    }
+
+
+def home_view(request):
+    """Home page - products grouped by category, grid served from the catalog cache.
+
+    The default grid shows the top products of each category; view_all and
+    category filters are paginated by cursor with a "load more" link.
+    """
+    params = home_params(request)
+    try:
+        product_grid = CatalogCache.render_grid(request, lambda: build_home_grid(**params), **params)
+    except InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor")
+    context = {
+        "product_grid": product_grid,
+        "categories": CatalogCache.get_categories(),
+        "q": params["q"],
+        "cat": params["cat"],
+    }
     return render(request, "shop/home.html", context)
 
 
+@require_http_methods(["GET"])
+def product_more_view(request):
+    """Next page of products as JSON for the "load more" button."""
+    try:
+        page = ProductService.get_product_page(
+            request.GET.get("q", ""),
+            request.GET.get("category", ""),
+            request.GET.get("cursor", ""),
+            request.GET.get("page_size"),
+        )
+    except InvalidCursor:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
+    sections = [
+        {
+            "category": {"name": name, "slug": slug},
+            "html": render_to_string("shop/_product_cards.html", {"products": products}, request=request),
+        }
+        for (_, name, slug), products in ProductService.group_by_category(page).items()
+    ]
+    return JsonResponse({"sections": sections, "next_cursor": page.next_cursor})
+
+
+def product_page_validators(request, updated_at, catalog_version):
+    """(ETag, Last-Modified) of a product detail page, or (None, None) if it must be rendered.
+
+    The page shows the product (updated_at; category and seller names bump
+    the catalog version), the visitor's name and role, the cart badge and
+    a CSRF token for the visitor's cookie. Pending flash messages are
+    rendered (and consumed) rather than answered with a 304.
+    """
+    if updated_at is None or len(messages.get_messages(request)):
+        return None, None
+    user = request.user
+    # Stored lines only (the session, or one values_list): never hydrates products.
+    cart_count = CartService.get_summary(request).count
+    parts = (
+        updated_at.isoformat(), catalog_version, user.pk, user.get_username(), getattr(user, "role", ""),
+        cart_count, request.META.get("CSRF_COOKIE", ""),
+    )
+    etag = quote_etag(hashlib.sha256("|".join(map(str, parts)).encode("utf-8")).hexdigest())
+    # If-Modified-Since alone cannot tell visitors apart, so only pages
+    # without per-visitor content get a Last-Modified.
+    last_modified = updated_at if not user.is_authenticated and not cart_count else None
+    return etag, last_modified
+
+
+def not_modified(request, etag, last_modified):
+    """304 (or 412) response if the request's preconditions match the page, else None."""
+    return get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp()) if last_modified else None
+    )
+
+
+def revalidate_per_visitor(response, etag, last_modified):
+    """Let the browser keep the page, but only for this visitor and after revalidating it."""
+    if etag:
+        response.headers.setdefault("ETag", etag)
+    if last_modified:
+        response.headers.setdefault("Last-Modified", http_date(last_modified.timestamp()))
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ("Cookie",))
+    return response
+
+
 def product_detail_view(request, slug):
-    """Product detail page."""
-    product = get_object_or_404(Product, slug=slug)
-    cart_items, _ = CartService.get_cart_items(request)
-    cart_count = sum(i["quantity"] for i in cart_items)
-    return render(request, "shop/product_detail.html", {"product": product, "cart_count": cart_count})
+    """Product detail page; conditional GETs are answered from updated_at before the product is loaded."""
+    updated_at = Product.objects.filter(slug=slug).values_list("updated_at", flat=True).first()
+    etag, last_modified = product_page_validators(request, updated_at, CatalogCache.get_version())
+    response = not_modified(request, etag, last_modified)
+    if response is None:
+        product = get_object_or_404(Product.objects.select_related("category", "seller"), slug=slug)
+        response = render(request, "shop/product_detail.html", {"product": product})
+    return revalidate_per_visitor(response, etag, last_modified)
 
 
 @require_http_methods(["POST"])
@@ -77,9 +178,8 @@ def cart_update_view(request, product_id):
 
 def cart_view(request):
     """View cart with totals."""
-    cart_items, total = CartService.get_cart_items(request)
-    cart_count = sum(i["quantity"] for i in cart_items)
-    return render(request, "shop/cart.html", {"cart_items": cart_items, "total": total, "cart_count": cart_count})
+    cart = CartService.get_summary(request)
+    return render(request, "shop/cart.html", {"cart_items": cart.items, "total": cart.total})
 
 
 @login_required
@@ -102,13 +202,13 @@ def checkout_view(request):
             "last_name": request.user.last_name or "",
             "phone": request.user.phone or "",
         })
-    cart_count = sum(i["quantity"] for i in cart_items)
     return render(request, "shop/checkout.html", {
-        "form": form, "cart_items": cart_items, "total": total, "cart_count": cart_count
+        "form": form, "cart_items": cart_items, "total": total
     })
 
 
 @login_required
+@read_from_primary()
 def order_success_view(request, order_id):
     """Order confirmation page."""
     order = get_object_or_404(Order, id=order_id, user=request.user)
@@ -117,25 +217,37 @@ def order_success_view(request, order_id):
 
 @login_required
 @seller_required
+@read_from_primary()
 def seller_dashboard_view(request):
-    """Seller dashboard - products, recent orders."""
-    from .models import OrderItem
-    products = Product.objects.filter(seller=request.user).select_related("category")
-    order_items = OrderItem.objects.filter(seller=request.user).select_related(
-        "order", "product"
-    ).order_by("-order__created_at")[:50]
-    orders_by_id = {}
-    for oi in order_items:
-        oid = oi.order_id
-        if oid not in orders_by_id:
-            orders_by_id[oid] = {"order": oi.order, "items": []}
-        orders_by_id[oid]["items"].append(oi)
-    recent_orders = list(orders_by_id.values())
+    """Seller dashboard - sales figures, products (paginated), latest orders."""
+    try:
+        products = ProductService.get_seller_product_page(
+            request.user, request.GET.get("products_cursor", ""), request.GET.get("page_size")
+        )
+    except InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor")
+    recent_orders = OrderService.get_seller_order_page(request.user, page_size=SELLER_DASHBOARD_ORDERS)
     return render(request, "shop/seller_dashboard.html", {
-        "products": products, "recent_orders": recent_orders
+        "products": products,
+        "recent_orders": recent_orders,
+        "stats": SellerAnalyticsService.dashboard(request.user),
     })
 
 
+@login_required
+@seller_required
+@read_from_primary()
+def seller_orders_view(request):
+    """Seller order history - the seller's lines grouped by order, newest first, by cursor."""
+    try:
+        orders = OrderService.get_seller_order_page(
+            request.user, request.GET.get("cursor", ""), request.GET.get("page_size")
+        )
+    except InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor")
+    return render(request, "shop/seller_orders.html", {"orders": orders})
+
+
 @login_required
 @seller_required
 @require_http_methods(["GET", "POST"])
@@ -154,6 +266,7 @@ def product_create_view(request):
 @login_required
 @seller_required
 @require_http_methods(["GET", "POST"])
+@read_from_primary()
 def product_edit_view(request, slug):
     """Edit product - seller only (own products)."""
     product = get_object_or_404(Product, slug=slug)
@@ -162,7 +275,7 @@ def product_edit_view(request, slug):
     if request.method == "POST":
         form = ProductForm(request.POST, request.FILES, instance=product)
         if form.is_valid():
-            form.save()
+            ProductService.update_product(form)
             return redirect("shop:product_detail", slug=product.slug)
     else:
         form = ProductForm(instance=product)
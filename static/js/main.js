@@ -46,18 +46,62 @@
       });
     });
 
-    // ----- Product card add button: brief feedback -----
-    document.querySelectorAll('.robo-card-add button[type="submit"]').forEach(function (btn) {
-      btn.addEventListener('click', function () {
-        var el = this;
-        var text = el.textContent;
-        el.textContent = 'Adding…';
-        el.disabled = true;
-        setTimeout(function () {
-          el.textContent = text;
-          el.disabled = false;
-        }, 1200);
-      });
+    // ----- Product card add button: brief feedback (also for loaded cards) -----
+    document.addEventListener('click', function (e) {
+      var btn = e.target.closest('.robo-card-add button[type="submit"]');
+      if (!btn) return;
+      var text = btn.textContent;
+      btn.textContent = 'Adding…';
+      btn.disabled = true;
+      setTimeout(function () {
+        btn.textContent = text;
+        btn.disabled = false;
+      }, 1200);
+    });
+
+    // ----- Load more: append the next page of products -----
+    document.addEventListener('click', function (e) {
+      var link = e.target.closest('.robo-load-more');
+      if (!link || !window.fetch) return;
+      e.preventDefault();
+      if (link.classList.contains('loading')) return;
+      link.classList.add('loading');
+      var url = link.dataset.url + '&cursor=' + encodeURIComponent(link.dataset.cursor);
+      fetch(url, { headers: { 'Accept': 'application/json' } })
+        .then(function (resp) {
+          if (!resp.ok) throw new Error(resp.status);
+          return resp.json();
+        })
+        .then(function (data) {
+          var wrap = link.parentNode;
+          data.sections.forEach(function (section) {
+            var sections = document.querySelectorAll('.robo-category-section');
+            var last = sections[sections.length - 1];
+            var grid;
+            if (last && last.dataset.category === section.category.slug) {
+              grid = last.querySelector('.robo-product-grid');
+            } else {
+              var el = document.createElement('section');
+              el.className = 'robo-category-section';
+              el.dataset.category = section.category.slug;
+              el.innerHTML = '<div class="robo-category-header"><h2 class="robo-category-title"></h2></div>' +
+                '<div class="robo-product-grid"></div>';
+              el.querySelector('.robo-category-title').textContent = section.category.name;
+              wrap.parentNode.insertBefore(el, wrap);
+              grid = el.querySelector('.robo-product-grid');
+            }
+            grid.insertAdjacentHTML('beforeend', section.html);
+          });
+          if (data.next_cursor) {
+            link.dataset.cursor = data.next_cursor;
+            link.classList.remove('loading');
+          } else {
+            wrap.remove();
+          }
+        })
+        .catch(function () {
+          window.location.href = link.href;
+        });
     });
   });
 })();